@@ -1,2 +1,4 @@
+from . import controllers
 from . import models
-from . import wizard
\ No newline at end of file
+from . import wizard
+from . import report
@@ -2,7 +2,7 @@
     'name': "Планирование работ на металлургическом комбинате",          # Название модуля
     'version': "1.0",                   # Версия модуля
     'author': "Your Name",              # Автор
-    'depends': ['hr', 'project', 'web'],
+    'depends': ['hr', 'mail', 'project', 'web'],
     #'category': "Agriculture",               # Категория (Custom, Sales, HR и т.д.)
     'summary': "Планирование работ на МК. Составление плана.", # Краткое описание
     'description': """                 # Полное описание (многострочное)
@@ -12,14 +12,25 @@
         'security/ir.model.access.csv',
         'data/shifts.xml',
         'data/stages.xml',
+        'data/ir_cron.xml',
         
         'views/project_calendar_views.xml',
+        'views/task_archive_views.xml',
+        'views/task_schedule_views.xml',
         # 'views/configuration_menu.xml',
         'data/shedule_data.xml',
-        'wizard/task_series_wizard.xml'
+        'wizard/task_series_wizard.xml',
+        'wizard/quality_control_import_wizard.xml',
+        'report/quality_spc_report.xml',
+        'report/shift_kpi_report.xml',
+        'report/employee_booking_report.xml',
     ],
+    'external_dependencies': {
+        'python': ['numpy'],
+    },
     'assets': {
         'web.assets_backend': [
+            'custom_project/static/src/js/calendar_model.js',
             'custom_project/static/src/js/create_tasks.js',
             'custom_project/static/src/js/create_series.js',
             'custom_project/static/src/js/edit_override.js'
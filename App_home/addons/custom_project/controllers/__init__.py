@@ -0,0 +1,3 @@
+from . import calendar
+from . import export
+from . import metrics
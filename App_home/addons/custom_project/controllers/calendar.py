@@ -0,0 +1,36 @@
+import json
+
+from odoo import fields, http
+from odoo.http import request
+from odoo.tools import date_utils
+
+
+class CalendarController(http.Controller):
+
+    @http.route("/custom_project/calendar", type="http", auth="user", methods=["GET"])
+    def calendar_data(self, domain="[]", date_from=None, date_to=None, project_id=None):
+        """
+        Данные календаря задач: только хранимые поля, сгруппированные по дню и смене.
+        Ответ помечается ETag; при совпадении If-None-Match отдаётся 304 без чтения задач.
+        """
+        search_domain = json.loads(domain)
+        if date_from:
+            search_domain.append(("date_start", ">=", fields.Datetime.to_datetime(date_from)))
+        if date_to:
+            search_domain.append(("date_start", "<", fields.Datetime.to_datetime(date_to)))
+        if project_id:
+            search_domain.append(("project_id", "=", int(project_id)))
+
+        task_model = request.env["project.task"]
+        etag = task_model.get_calendar_etag(search_domain)
+        headers = [("ETag", f'"{etag}"'), ("Cache-Control", "private, no-cache")]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response("", headers=headers, status=304)
+
+        payload = json.dumps(
+            {"days": task_model.get_calendar_buckets(search_domain)},
+            default=date_utils.json_default,
+        )
+        return request.make_response(
+            payload, headers=headers + [("Content-Type", "application/json; charset=utf-8")]
+        )
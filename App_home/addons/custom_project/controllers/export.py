@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import tempfile
+
+import xlsxwriter
+
+from odoo import api, fields, http
+from odoo.http import request
+
+from ..models.project_task import EXPORT_HEADERS
+
+# Размер блока при отдаче готового XLSX-файла, байт
+XLSX_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class TaskExportController(http.Controller):
+
+    @http.route("/custom_project/export/tasks", type="http", auth="user", methods=["GET"])
+    def export_tasks(self, file_format="csv", date_from=None, date_to=None, project_id=None, domain="[]"):
+        """
+        Потоковая выгрузка задач за период в CSV или XLSX.
+        CSV отдаётся построчно по мере чтения страниц; XLSX пишется xlsxwriter
+        в режиме constant_memory во временный файл и отдаётся блоками.
+        """
+        search_domain = json.loads(domain)
+        if date_from:
+            search_domain.append(("date_start", ">=", fields.Datetime.to_datetime(date_from)))
+        if date_to:
+            search_domain.append(("date_start", "<", fields.Datetime.to_datetime(date_to)))
+        if project_id:
+            search_domain.append(("project_id", "=", int(project_id)))
+
+        # Курсор запроса закрывается до окончания отдачи, страницы читаются своим курсором
+        registry, uid, context = request.env.registry, request.env.uid, dict(request.env.context)
+
+        def iter_rows():
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                yield from env["project.task"]._iter_export_rows(search_domain)
+
+        filename = f"shift_tasks_{fields.Date.today()}.{'xlsx' if file_format == 'xlsx' else 'csv'}"
+        if file_format == "xlsx":
+            body = self._stream_xlsx(iter_rows())
+            content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        else:
+            body = self._stream_csv(iter_rows())
+            content_type = "text/csv; charset=utf-8"
+
+        response = request.make_response(
+            body,
+            headers=[
+                ("Content-Type", content_type),
+                ("Content-Disposition", http.content_disposition(filename)),
+            ],
+        )
+        response.direct_passthrough = True
+        return response
+
+    @staticmethod
+    def _stream_csv(rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=";")
+        # BOM, чтобы Excel открыл файл в UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(EXPORT_HEADERS)
+        for row_number, row in enumerate(rows, 1):
+            writer.writerow([fields.Datetime.to_string(value) if hasattr(value, "hour") else value for value in row])
+            if row_number % 500 == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    @staticmethod
+    def _stream_xlsx(rows):
+        with tempfile.TemporaryFile() as xlsx_file:
+            workbook = xlsxwriter.Workbook(xlsx_file, {"constant_memory": True, "remove_timezone": True})
+            worksheet = workbook.add_worksheet("Смены")
+            datetime_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm"})
+            header_format = workbook.add_format({"bold": True})
+            worksheet.write_row(0, 0, EXPORT_HEADERS, header_format)
+            for row_number, row in enumerate(rows, 1):
+                for column, value in enumerate(row):
+                    if hasattr(value, "hour"):
+                        worksheet.write_datetime(row_number, column, value, datetime_format)
+                    else:
+                        worksheet.write(row_number, column, value)
+            workbook.close()
+
+            xlsx_file.seek(0)
+            while True:
+                chunk = xlsx_file.read(XLSX_STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
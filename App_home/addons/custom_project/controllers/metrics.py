@@ -0,0 +1,31 @@
+import hmac
+
+from odoo import http
+from odoo.http import request
+from odoo.tools import config
+
+from ..instrumentation import render_prometheus
+
+
+class MetricsController(http.Controller):
+
+    @http.route("/custom_project/metrics", type="http", auth="none", methods=["GET"], csrf=False, save_session=False)
+    def metrics(self):
+        """
+        Метрики инструментации в формате Prometheus.
+        Доступны только при заданном в конфигурации Odoo custom_project_metrics_token
+        и заголовке запроса Authorization: Bearer <токен>; без токена endpoint закрыт.
+        Счётчики процесса, поэтому полные значения — только в многопоточном режиме
+        (workers = 0), см. instrumentation.
+        """
+        token = config.get("custom_project_metrics_token")
+        if not token:
+            return request.not_found()
+        authorization = request.httprequest.headers.get("Authorization", "")
+        if not hmac.compare_digest(authorization, f"Bearer {token}"):
+            return request.make_response("Unauthorized", status=401)
+
+        return request.make_response(
+            render_prometheus(),
+            headers=[("Content-Type", "text/plain; version=0.0.4; charset=utf-8")],
+        )
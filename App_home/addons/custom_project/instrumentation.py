@@ -0,0 +1,130 @@
+"""
+Лёгкая инструментация горячих методов модуля.
+
+Декоратор instrumented собирает по каждому методу число вызовов, время,
+количество SQL-запросов и обработанных записей. Метрики агрегируются в памяти
+процесса и отдаются в текстовом формате Prometheus (controllers/metrics.py).
+
+Полная картина получается только в многопоточном режиме (workers = 0), где
+HTTP-запросы и CRON выполняются в одном процессе. В режиме prefork у каждого
+воркера свои счётчики: запрос метрик обслуживает случайный HTTP-воркер, а
+cron-воркеры на HTTP не отвечают вовсе, поэтому значения неполные и скачут
+между сборами. Серии помечаются меткой pid, чтобы такие скачки были видны.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Порог медленного вызова по умолчанию, миллисекунд
+DEFAULT_SLOW_CALL_THRESHOLD_MS = 1000
+
+# Метрики: {имя метода: MethodStats}
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class MethodStats:
+    __slots__ = ("calls", "seconds", "max_seconds", "queries", "rows", "slow_calls", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.slow_calls = 0
+        self.errors = 0
+
+
+def instrumented(name=None, rows=None):
+    """
+    Декоратор метода модели. name — имя метрики (по умолчанию Модель.метод),
+    rows — функция (записи, результат) -> количество обработанных записей
+    (по умолчанию размер набора записей). Ставится ближе всего к def,
+    под декораторами api.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metric_name = name or f"{self._name}.{method.__name__}"
+            cr = self.env.cr
+            queries_before = cr.sql_log_count
+            started = time.perf_counter()
+            failed = True
+            result = None
+            try:
+                result = method(self, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                row_count = len(self) if rows is None or failed else rows(self, result)
+                _record(self.env, metric_name, elapsed, cr.sql_log_count - queries_before, row_count, failed)
+
+        return wrapper
+
+    return decorator
+
+
+def _record(env, metric_name, elapsed, queries, row_count, failed):
+    slow = elapsed * 1000 >= _get_slow_call_threshold_ms(env)
+    with _stats_lock:
+        stats = _stats.get(metric_name)
+        if stats is None:
+            stats = _stats[metric_name] = MethodStats()
+        stats.calls += 1
+        stats.seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        stats.queries += queries
+        stats.rows += row_count
+        stats.errors += failed
+        stats.slow_calls += slow
+
+    if slow:
+        _logger.warning(
+            "Медленный вызов %s: %.0f мс, SQL-запросов %s, записей %s",
+            metric_name, elapsed * 1000, queries, row_count,
+        )
+
+
+def _get_slow_call_threshold_ms(env):
+    try:
+        return float(
+            env["ir.config_parameter"].sudo().get_param(
+                "custom_project.slow_call_threshold_ms", DEFAULT_SLOW_CALL_THRESHOLD_MS
+            )
+        )
+    except Exception:
+        # Транзакция могла быть прервана ошибкой самого метода
+        return DEFAULT_SLOW_CALL_THRESHOLD_MS
+
+
+def render_prometheus():
+    """Метрики процесса в текстовом формате Prometheus"""
+    with _stats_lock:
+        snapshot = {
+            metric_name: {field: getattr(stats, field) for field in MethodStats.__slots__}
+            for metric_name, stats in sorted(_stats.items())
+        }
+
+    pid = os.getpid()
+    lines = []
+    for metric, field, metric_type, help_text in (
+        ("custom_project_method_calls_total", "calls", "counter", "Количество вызовов"),
+        ("custom_project_method_seconds_total", "seconds", "counter", "Суммарное время, с"),
+        ("custom_project_method_seconds_max", "max_seconds", "gauge", "Максимальное время вызова, с"),
+        ("custom_project_method_queries_total", "queries", "counter", "SQL-запросов"),
+        ("custom_project_method_rows_total", "rows", "counter", "Обработано записей"),
+        ("custom_project_method_slow_calls_total", "slow_calls", "counter", "Медленных вызовов"),
+        ("custom_project_method_errors_total", "errors", "counter", "Вызовов с ошибкой"),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for metric_name, values in snapshot.items():
+            lines.append(f'{metric}{{method="{metric_name}",pid="{pid}"}} {values[field]}')
+    return "\n".join(lines) + "\n"
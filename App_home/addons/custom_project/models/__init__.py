@@ -4,4 +4,10 @@ from . import project_task_stage
 from . import project_task_type
 from . import project_task
 from . import quality_control
-from . import shift
\ No newline at end of file
+from . import quality_control_measurement
+from . import shift
+from . import shift_instance
+from . import shift_rollup
+from . import shift_kpi
+from . import employee_booking
+from . import task_archive
@@ -0,0 +1,152 @@
+import heapq
+from datetime import datetime, time, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from odoo import api, fields, models
+
+# Минимальный отдых между сменами исполнителя по умолчанию, часов
+DEFAULT_MIN_REST_HOURS = 8
+# Режимы проверки назначений при записи задач (custom_project.employee_booking_check)
+BOOKING_CHECK_OFF = "off"
+BOOKING_CHECK_OVERLAP = "overlap"
+BOOKING_CHECK_REST = "rest"
+
+
+class EmployeeBooking(models.AbstractModel):
+    _name = "custom_project.employee.booking"
+    _description = "Проверка занятости исполнителей"
+
+    @api.model
+    def find_conflicts(self, date_from, date_to, employee_ids=None, min_rest_hours=None):
+        """
+        Конфликты назначений исполнителей за период [date_from, date_to):
+        пересечения интервалов работ (overlap) и недостаточный отдых между
+        последовательными сменами (rest). Назначения читаются одним запросом
+        в порядке (исполнитель, начало), конфликты находятся одним проходом
+        с кучей активных интервалов по каждому исполнителю.
+        """
+        date_from = fields.Datetime.to_datetime(date_from)
+        date_to = fields.Datetime.to_datetime(date_to)
+        if min_rest_hours is None:
+            min_rest_hours = self._get_min_rest_hours()
+        min_rest = timedelta(hours=min_rest_hours)
+
+        conflicts = []
+        for employee_id, rows in groupby(
+            self._read_assignments(date_from - min_rest, date_to, employee_ids), key=itemgetter(0)
+        ):
+            active = []  # куча (конец, начало, id задачи) пересекающихся интервалов
+            last_finished = None
+            for _employee_id, task_id, start, end in rows:
+                while active and active[0][0] <= start:
+                    finished = heapq.heappop(active)
+                    if not last_finished or finished[0] >= last_finished[0]:
+                        last_finished = finished
+
+                for other_end, other_start, other_task_id in active:
+                    conflicts.append(self._make_conflict(
+                        "overlap", employee_id, (task_id, start, end), (other_task_id, other_start, other_end)
+                    ))
+                if not active and last_finished and start - last_finished[0] < min_rest:
+                    conflicts.append(self._make_conflict(
+                        "rest", employee_id, (task_id, start, end),
+                        (last_finished[2], last_finished[1], last_finished[0]),
+                    ))
+                heapq.heappush(active, (end, start, task_id))
+
+        # Пары, целиком лежащие до начала периода, попали в выборку только ради отдыха
+        return [conflict for conflict in conflicts if conflict["end"] > date_from]
+
+    @api.model
+    def _make_conflict(self, kind, employee_id, task, other_task):
+        task_id, start, end = task
+        other_task_id, other_start, other_end = other_task
+        return {
+            "kind": kind,
+            "employee_id": employee_id,
+            "task_id": task_id,
+            "start": start,
+            "end": end,
+            "other_task_id": other_task_id,
+            "other_start": other_start,
+            "other_end": other_end,
+            "gap_hours": round((start - other_end).total_seconds() / 3600, 2),
+        }
+
+    @api.model
+    def _read_assignments(self, date_from, date_to, employee_ids=None):
+        """
+        Назначения (id исполнителя, id задачи, начало, конец) активных задач,
+        пересекающих период. Интервал работы — экземпляр смены, иначе
+        начало задачи и конец дня срока.
+        """
+        task_model = self.env["project.task"]
+        employee_field = task_model._fields["employee_ids"]
+        task_model.flush_model(["employee_ids", "date_start", "date_deadline", "shift_instance_id", "active"])
+        self.env["custom_project.shift.instance"].flush_model(["start_datetime", "end_datetime"])
+
+        employee_filter = f"AND rel.{employee_field.column2} IN %(employee_ids)s" if employee_ids else ""
+        self.env.cr.execute(
+            f"""
+            SELECT employee_id, task_id, start_at, end_at
+              FROM (
+                    SELECT rel.{employee_field.column2} AS employee_id,
+                           t.id AS task_id,
+                           COALESCE(si.start_datetime, t.date_start) AS start_at,
+                           COALESCE(si.end_datetime, (t.date_deadline + 1)::timestamp) AS end_at
+                      FROM {employee_field.relation} rel
+                      JOIN project_task t ON t.id = rel.{employee_field.column1}
+                 LEFT JOIN custom_project_shift_instance si ON si.id = t.shift_instance_id
+                     WHERE t.active
+                       {employee_filter}
+                   ) assignment
+             WHERE start_at < %(date_to)s
+               AND end_at > %(date_from)s
+               AND end_at > start_at
+          ORDER BY employee_id, start_at, end_at, task_id
+            """,
+            {
+                "date_from": date_from,
+                "date_to": date_to,
+                "employee_ids": tuple(employee_ids or ()),
+            },
+        )
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _get_task_interval(self, task):
+        """
+        Интервал работы задачи (начало, конец) по тем же правилам, что в _read_assignments:
+        экземпляр смены, иначе начало задачи и конец дня срока; конец может быть неизвестен
+        """
+        instance = task.shift_instance_id
+        if instance:
+            return instance.start_datetime, instance.end_datetime
+        if task.date_deadline:
+            return task.date_start, datetime.combine(task.date_deadline + timedelta(days=1), time.min)
+        return task.date_start, None
+
+    @api.model
+    def _is_rest_too_short(self, previous_task, task, min_rest_hours):
+        """Начинается ли task раньше, чем через min_rest_hours после окончания previous_task"""
+        _previous_start, previous_end = self._get_task_interval(previous_task)
+        start, _end = self._get_task_interval(task)
+        if not previous_end or not start:
+            return False
+        return start - previous_end < timedelta(hours=min_rest_hours)
+
+    @api.model
+    def _get_min_rest_hours(self):
+        return float(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "custom_project.min_rest_hours", DEFAULT_MIN_REST_HOURS
+            )
+        )
+
+    @api.model
+    def _get_check_mode(self):
+        """Режим проверки при записи: off (по умолчанию), overlap или rest"""
+        return self.env["ir.config_parameter"].sudo().get_param(
+            "custom_project.employee_booking_check", BOOKING_CHECK_OFF
+        )
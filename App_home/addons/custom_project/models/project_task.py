@@ -1,10 +1,87 @@
+from collections import defaultdict
 from datetime import timedelta
 from odoo import fields, models, api
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import sql
+import hashlib
 import logging
+import random
+import time
+import psycopg2
+from psycopg2 import errors as pg_errors
+
+from ..instrumentation import instrumented
+from .employee_booking import BOOKING_CHECK_OVERLAP, BOOKING_CHECK_REST
+from .shift_rollup import ROLLUP_TASK_FIELDS
 
 _logger = logging.getLogger(__name__)
 
+UNIQUE_SHIFT_SLOT_INDEX = "project_task_unique_shift_slot_idx"
+# Ключ цепочки смен (цех, тип процесса, тип работы) для индекса и поиска соседних смен.
+# Пустые значения приводятся к 0/'' — IS NOT DISTINCT FROM индексом не обслуживается
+SHIFT_CHAIN_KEY_SQL = [
+    "COALESCE({alias}project_id, 0)",
+    "COALESCE({alias}process_type, '')",
+    "COALESCE({alias}custom_task_type_id, 0)",
+]
+SHIFT_CHAIN_INDEX = "project_task_shift_chain_idx"
+KEYSET_PAGE_SIZE = 80
+# Задач на страницу потоковой выгрузки
+EXPORT_PAGE_SIZE = 2000
+# Заголовки колонок выгрузки задач (порядок соответствует _iter_export_rows)
+EXPORT_HEADERS = [
+    "Начало (UTC)",
+    "Смена",
+    "Цех",
+    "Работа",
+    "Тип работы",
+    "Тип процесса",
+    "Стадия",
+    "Исполнители",
+    "Исполнителей по факту",
+    "Расход материала (кг)",
+    "Статус ОТК",
+    "Последний акт ОТК",
+    "Факт. начало (UTC)",
+    "Факт. завершение (UTC)",
+]
+# Хранимые поля задачи, которые отдаёт календарный endpoint
+CALENDAR_FIELDS = [
+    "name",
+    "date_start",
+    "date_deadline",
+    "project_id",
+    "stage_id",
+    "user_ids",
+    "priority",
+    "process_type",
+    "shift",
+    "shift_color",
+    "production_cycle",
+]
+# Таблицы связей many2one из CALENDAR_FIELDS: их названия попадают в ответ календаря
+CALENDAR_RELATED_TABLES = ["project_project", "project_task_type", "custom_project_shift"]
+# Цвета смен в календаре по коду смены
+SHIFT_COLORS = {"morning": 10, "day": 3, "night": 0}
+
+# Первый ключ advisory-блокировки цеха при автовзятии задач (второй — id цеха)
+AUTO_TAKE_LOCK_NAMESPACE = 7301
+# Попыток обработки цеха при конфликте блокировок или сериализации
+AUTO_TAKE_MAX_ATTEMPTS = 3
+# Ожидание блокировки строк при обработке одного цеха
+AUTO_TAKE_LOCK_TIMEOUT = "5s"
+# Базовая пауза перед повтором транзакции цеха после конфликта сериализации, секунд
+AUTO_TAKE_RETRY_BACKOFF = 0.1
+
+# Контекст системных массовых операций: без трекинга, подписок и уведомлений
+BULK_MODE_CONTEXT = {
+    "tracking_disable": True,
+    "mail_create_nolog": True,
+    "mail_create_nosubscribe": True,
+    "mail_notrack": True,
+    "mail_auto_subscribe_no_notify": True,
+}
+
 
 class ProjectTask(models.Model):
     _name = "project.task"
@@ -45,7 +122,7 @@ class ProjectTask(models.Model):
     )
 
     shift_number = fields.Selection(
-        [(str(i), str(i)) for i in range(1, 3)], string="Номер смены"
+        [(str(i), str(i)) for i in range(1, 4)], string="Номер смены"
     )
 
     maintenance_day = fields.Integer(string="День ТО оборудования")
@@ -57,20 +134,37 @@ class ProjectTask(models.Model):
     date_start = fields.Datetime(
         string="Дата начала", required=True, default=fields.Datetime.now
     )
+
+    date_day = fields.Date(
+        string="День работы",
+        compute="_compute_date_day",
+        store=True,
+        index=True,
+    )
     
     shift = fields.Many2one(
         "custom_project.shift", string="Смена"
     )
 
+    shift_instance_id = fields.Many2one(
+        "custom_project.shift.instance",
+        string="Смена в календаре",
+        compute="_compute_shift_instance_id",
+        store=True,
+        index=True,
+    )
+
     shift_code = fields.Selection(
         related="shift.code",
         string="Код смены",
         readonly=True
     )
 
-    shift_color = fields.Integer(string="Цвет смены", compute="_compute_shift_color")
+    shift_color = fields.Integer(string="Цвет смены", compute="_compute_shift_color", store=True)
 
-    production_cycle = fields.Char(string="Производственный цикл", compute="_compute_production_cycle")
+    production_cycle = fields.Char(
+        string="Производственный цикл", compute="_compute_production_cycle", store=True
+    )
 
     custom_task_type_id = fields.Many2one(
         "project.task.type", string="Тип работы"
@@ -91,123 +185,629 @@ class ProjectTask(models.Model):
             ("rejected", "Отклонено ОТК"),
         ],
         string="Статус контроля качества",
-        compute="_compute_quality_status",
+        compute="_compute_quality_summary",
         store=True,
         help="Статус контроля качества от отдела технического контроля",
     )
 
     has_quality_control = fields.Boolean(
         string="Есть контроль качества",
-        compute="_compute_has_quality_control",
+        compute="_compute_quality_summary",
         store=True,
         index=True,
     )
 
+    last_quality_control_id = fields.Many2one(
+        "quality.control",
+        string="Последний акт ОТК",
+        compute="_compute_quality_summary",
+        store=True,
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._ensure_shift_instances([vals.get("date_start") or fields.Datetime.now() for vals in vals_list])
+        tasks = super().create(vals_list)
+        tasks._refresh_shift_rollups()
+        return tasks
+
+    def write(self, vals):
+        if vals.get("date_start"):
+            self._ensure_shift_instances([vals["date_start"]])
+        rollup_affected = bool(ROLLUP_TASK_FIELDS & set(vals))
+        old_rollup_keys = self._get_shift_rollup_keys() if rollup_affected else set()
+        res = super().write(vals)
+        if rollup_affected:
+            self._refresh_shift_rollups(old_rollup_keys)
+        if "stage_id" in vals and not self.env.context.get("skip_successor_activation"):
+            completed_stage = self.env.ref("custom_project.project_task_stage_completed")
+            if vals["stage_id"] == completed_stage.id:
+                self._activate_successor_tasks()
+        return res
+
+    @instrumented(rows=lambda tasks, result: len(result))
+    def _activate_successor_tasks(self):
+        """
+        Передача смены по событию: при завершении задачи сразу берётся в работу
+        задача следующей смены, не дожидаясь CRON. Отбор тот же, что у CRON,
+        поэтому CRON остаётся сверкой пропущенных задач.
+        """
+        successor_ids = set(self._find_next_shift_tasks().values())
+        if not successor_ids:
+            return self.browse()
+
+        successors = self.browse(successor_ids).filtered_domain(self._get_auto_take_domain())
+        tasks_auto_taken = successors.with_context(
+            skip_successor_activation=True, **BULK_MODE_CONTEXT
+        )._auto_take_shift_tasks()
+        tasks_auto_taken._post_auto_take_summary()
+        return tasks_auto_taken
+
+    def unlink(self):
+        # При переносе в архив сводки по сменам сохраняют историю
+        if self.env.context.get("skip_shift_rollup"):
+            return super().unlink()
+        rollup_keys = self._get_shift_rollup_keys()
+        res = super().unlink()
+        self.env["custom_project.shift.rollup"].sudo()._refresh_keys(rollup_keys)
+        return res
+
+    def _get_shift_rollup_keys(self):
+        """Ключи сводки по сменам (id цеха, день, id смены) для набора задач"""
+        return {
+            (task.project_id.id, task.date_day, task.shift.id)
+            for task in self.with_context(active_test=False)
+        }
+
+    def _refresh_shift_rollups(self, extra_keys=()):
+        """Обновляет сводки по сменам для текущих и прежних ключей набора"""
+        keys = self._get_shift_rollup_keys() | set(extra_keys)
+        self.env["custom_project.shift.rollup"].sudo()._refresh_keys(keys)
+
+    def init(self):
+        super().init()
+        self._init_unique_shift_slot_index()
+        self._init_access_path_indexes()
+
+    def _init_access_path_indexes(self):
+        """Составные индексы под поиск предыдущей смены, _order и выборку по ключу"""
+        cr = self.env.cr
+        # _find_previous_shift_tasks: равенства ключа цепочки + date_start < x ORDER BY date_start DESC.
+        # Прежний индекс по самим колонкам не подходил для сравнения пустых значений
+        sql.drop_index(cr, "project_task_previous_shift_idx", self._table)
+        sql.create_index(
+            cr,
+            SHIFT_CHAIN_INDEX,
+            self._table,
+            [expr.format(alias="") for expr in SHIFT_CHAIN_KEY_SQL] + ["date_start DESC"],
+        )
+        # Порядок по умолчанию модели
+        sql.create_index(
+            cr,
+            "project_task_default_order_idx",
+            self._table,
+            ["date_start", "process_type", "id DESC"],
+        )
+        # Постраничная выборка по ключу (date_start, id)
+        sql.create_index(
+            cr,
+            "project_task_date_start_id_idx",
+            self._table,
+            ["date_start", "id"],
+        )
+
+    def _init_unique_shift_slot_index(self):
+        """
+        Уникальный индекс по цеху, дню, типу процесса и смене.
+        Страхует проверку _constrain_unique_task от параллельных созданий.
+        Если в базе уже есть дубли, индекс не создаётся (остаётся проверка в Python).
+        """
+        cr = self.env.cr
+        if sql.index_exists(cr, UNIQUE_SHIFT_SLOT_INDEX):
+            return
+
+        # Заполняем день до создания индекса, пересчёт ORM даст те же значения
+        cr.execute(
+            """
+            UPDATE project_task
+               SET date_day = date_start::date
+             WHERE date_day IS NULL
+               AND date_start IS NOT NULL
+            """
+        )
+        try:
+            with cr.savepoint():
+                cr.execute(
+                    f"""
+                    CREATE UNIQUE INDEX {UNIQUE_SHIFT_SLOT_INDEX}
+                        ON project_task (project_id, date_day, process_type, shift)
+                     WHERE active
+                       AND project_id IS NOT NULL
+                       AND process_type IS NOT NULL
+                       AND shift IS NOT NULL
+                    """
+                )
+        except psycopg2.IntegrityError:
+            _logger.warning(
+                "Не удалось создать индекс %s: в таблице задач есть дубли смен",
+                UNIQUE_SHIFT_SLOT_INDEX,
+            )
+
+    @api.model
+    def _ensure_shift_instances(self, moments):
+        """
+        Календарь смен на даты моментов до записи задач,
+        чтобы _compute_shift_instance_id только искал смены, а не создавал их.
+        """
+        moments = [fields.Datetime.to_datetime(moment) for moment in moments if moment]
+        if moments:
+            self.env["custom_project.shift.instance"]._ensure_instances(
+                min(moments).date() - timedelta(days=1), max(moments).date()
+            )
+
+    @api.depends("date_start")
+    def _compute_shift_instance_id(self):
+        """Привязка к смене календаря одним запросом на весь набор"""
+        located = self.env["custom_project.shift.instance"]._locate_many(
+            [task.date_start for task in self]
+        )
+        for task in self:
+            task.shift_instance_id = located.get(task.date_start, False)
+
+    @api.depends("date_start")
+    def _compute_date_day(self):
+        for record in self:
+            record.date_day = record.date_start.date() if record.date_start else False
+
     @api.constrains(
         "project_id", "date_start", "process_type", "shift", "custom_task_type_id"
     )
+    @instrumented()
     def _constrain_unique_task(self):
-        for record in self:
-            if not record.date_start:
-                continue
-            day_start = record.date_start.replace(
-                hour=0, minute=0, second=0, microsecond=0
+        """Проверка уникальности работы в смене одним запросом на весь набор"""
+        tasks = self.filtered("date_start")
+        if not tasks:
+            return
+
+        self.flush_model(["project_id", "date_day", "process_type", "shift", "active"])
+        self.env.cr.execute(
+            """
+            SELECT t.id
+              FROM project_task t
+              JOIN project_task o
+                ON o.date_day = t.date_day
+               AND o.project_id IS NOT DISTINCT FROM t.project_id
+               AND o.process_type IS NOT DISTINCT FROM t.process_type
+               AND o.shift IS NOT DISTINCT FROM t.shift
+               AND o.id != t.id
+               AND o.active
+             WHERE t.id IN %s
+             LIMIT 1
+            """,
+            [tuple(tasks.ids)],
+        )
+        if self.env.cr.fetchone():
+            raise ValidationError(
+                "Работа с такими параметрами уже существует в эту смену!"
+            )
+
+    @api.constrains("employee_ids", "date_start", "date_deadline", "shift_instance_id", "active")
+    @instrumented()
+    def _check_employee_double_booking(self):
+        """
+        Проверка занятости исполнителей для всего набора одним проходом.
+        Включается параметром custom_project.employee_booking_check:
+        overlap — пересечения работ, rest — ещё и отдых между сменами.
+        """
+        booking_model = self.env["custom_project.employee.booking"]
+        check_mode = booking_model._get_check_mode()
+        if check_mode not in (BOOKING_CHECK_OVERLAP, BOOKING_CHECK_REST):
+            return
+
+        tasks = self.filtered(lambda t: t.active and t.employee_ids and t.date_start)
+        if not tasks:
+            return
+
+        min_rest_hours = booking_model._get_min_rest_hours() if check_mode == BOOKING_CHECK_REST else 0
+        date_from = min(tasks.mapped("date_start")) - timedelta(days=1)
+        date_to = max(tasks.mapped("date_start")) + timedelta(days=2)
+        conflicts = [
+            conflict
+            for conflict in booking_model.find_conflicts(
+                date_from, date_to, tasks.employee_ids.ids, min_rest_hours
             )
-            day_end = day_start.replace(
-                hour=23, minute=59, second=59, microsecond=999999
+            if conflict["task_id"] in tasks.ids or conflict["other_task_id"] in tasks.ids
+        ]
+        if not conflicts:
+            return
+
+        employees = self.env["hr.employee"].browse({c["employee_id"] for c in conflicts})
+        names = dict(employees.sudo().name_get())
+        kind_labels = {"overlap": "пересечение работ", "rest": "недостаточный отдых между работами"}
+        lines = [
+            "• %s: %s %s и %s" % (
+                names.get(conflict["employee_id"]),
+                kind_labels[conflict["kind"]],
+                conflict["other_task_id"],
+                conflict["task_id"],
             )
-            domain = [
-                ("project_id", "=", record.project_id.id),
-                ("date_start", ">=", day_start),
-                ("date_start", "<=", day_end),
-                ("process_type", "=", record.process_type),
-                ("shift", "=", record.shift.id),
-                # ("custom_task_type_id", "=", record.custom_task_type_id.id),
-                ("id", "!=", record.id),
-            ]
-            if self.search_count(domain) > 0:
-                raise ValidationError(
-                    "Работа с такими параметрами уже существует в эту смену!"
-                )
+            for conflict in conflicts[:10]
+        ]
+        raise ValidationError("Исполнители заняты в других работах:\n" + "\n".join(lines))
 
     @api.model
+    @instrumented()
     def _cron_auto_take_shift_tasks(self):
         """
-        CRON задача для автоматического взятия в работу задач по сменам
+        CRON задача для автоматического взятия в работу задач по сменам.
+        Основной путь — передача смены при завершении задачи (_activate_successor_tasks),
+        CRON подбирает пропущенные задачи. Работа разбита по цехам: каждый цех
+        обрабатывается в своей транзакции под advisory-блокировкой, поэтому несколько
+        cron-воркеров обрабатывают
+        разные цеха параллельно, а сбой или блокировка одного цеха не задерживает остальные.
         """
         _logger.info("Запуск автоматического взятия сменных задач")
 
+        domain = self._get_auto_take_domain()
+        project_ids = [
+            group["project_id"][0]
+            for group in self.read_group(domain, ["project_id"], ["project_id"])
+            if group["project_id"]
+        ]
+        # Воркеры начинают с разных цехов, чтобы реже упираться в чужие блокировки
+        random.shuffle(project_ids)
+
+        for project_id in project_ids:
+            tasks_auto_taken = self._auto_take_project_partition(project_id, domain)
+            if tasks_auto_taken:
+                _logger.info(
+                    "Цех %s: автоматически взяты в работу задачи %s",
+                    project_id, tasks_auto_taken.ids,
+                )
+
+    @api.model
+    def _get_auto_take_domain(self):
+        """Запланированные на сегодня задачи с автоматическим взятием в работу"""
         now_utc = fields.Datetime.now()
         today_start = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = today_start.replace(hour=23, minute=59, second=59, microsecond=999999)
+        return [
+            ("date_start", ">=", today_start),
+            ("date_start", "<=", today_end),
+            ("stage_id", "=", self.env.ref("custom_project.project_task_stage_planned").id),
+            ("auto_tracking", "=", True),
+        ]
+
+    @api.model
+    @instrumented(rows=lambda tasks, result: len(result))
+    def _auto_take_project_partition(self, project_id, domain):
+        """
+        Автовзятие задач одного цеха в отдельной транзакции.
+        Цех, заблокированный другим воркером, пропускается. Таймаут блокировки строк
+        повторяется с точки сохранения, конфликт сериализации или взаимоблокировка —
+        в новой транзакции с паузой, всего до AUTO_TAKE_MAX_ATTEMPTS попыток.
+        Возвращает взятые в работу задачи.
+        """
+        cr = self.env.cr
+        tasks_auto_taken = self.browse()
+        locked = False
+        for attempt in range(1, AUTO_TAKE_MAX_ATTEMPTS + 1):
+            if not locked:
+                cr.execute(
+                    "SELECT pg_try_advisory_xact_lock(%s, %s)", [AUTO_TAKE_LOCK_NAMESPACE, project_id]
+                )
+                if not cr.fetchone()[0]:
+                    return self.browse()
+                cr.execute("SET LOCAL lock_timeout = %s", [AUTO_TAKE_LOCK_TIMEOUT])
+                locked = True
+            try:
+                with cr.savepoint():
+                    tasks = self.search(domain + [("project_id", "=", project_id)])
+                    tasks_auto_taken = tasks.with_context(**BULK_MODE_CONTEXT)._auto_take_shift_tasks()
+                    tasks_auto_taken._post_auto_take_summary()
+                    self.env.flush_all()
+                break
+            except (pg_errors.SerializationFailure, pg_errors.DeadlockDetected) as e:
+                # Снимок транзакции устарел, в ней повтор не пройдёт: откатываем её целиком,
+                # вместе с ней снимается и блокировка цеха
+                cr.rollback()
+                self.env.invalidate_all()
+                tasks_auto_taken = self.browse()
+                locked = False
+                _logger.warning(
+                    "Цех %s: конфликт сериализации при автовзятии задач, попытка %s из %s: %s",
+                    project_id, attempt, AUTO_TAKE_MAX_ATTEMPTS, e,
+                )
+                if attempt < AUTO_TAKE_MAX_ATTEMPTS:
+                    time.sleep(random.uniform(0, AUTO_TAKE_RETRY_BACKOFF * 2 ** attempt))
+            except psycopg2.OperationalError as e:
+                # Таймаут блокировки строк: откат до точки сохранения, блокировка цеха остаётся
+                self.env.invalidate_all()
+                tasks_auto_taken = self.browse()
+                _logger.warning(
+                    "Цех %s: конфликт при автовзятии задач, попытка %s из %s: %s",
+                    project_id, attempt, AUTO_TAKE_MAX_ATTEMPTS, e,
+                )
+            except Exception:
+                self.env.invalidate_all()
+                tasks_auto_taken = self.browse()
+                _logger.exception("Цех %s: ошибка автовзятия задач", project_id)
+                break
+
+        # Фиксация освобождает блокировку цеха
+        if not self.env.registry.in_test_mode():
+            cr.commit()
+        return tasks_auto_taken
+
+    def _auto_take_shift_tasks(self):
+        """
+        Пакетное взятие в работу задач, у которых завершена задача предыдущей смены.
+        Исполнители предыдущей смены переносятся на задачу. В режиме проверки отдыха
+        (employee_booking_check = rest) бригада не переносится, если до начала задачи
+        она не успевает отдохнуть: задача берётся в работу с прежними исполнителями,
+        смену доукомплектовывает мастер. Предшественники ищутся одним запросом,
+        запись выполняется группами с одинаковыми значениями.
+        Возвращает взятые в работу задачи.
+        """
+        if not self:
+            return self.browse()
+
+        stage_completed = self.env.ref("custom_project.project_task_stage_completed")
+        stage_in_progress = self.env.ref("custom_project.project_task_stage_in_progress")
+        booking_model = self.env["custom_project.employee.booking"]
+        min_rest_hours = None
+        if booking_model._get_check_mode() == BOOKING_CHECK_REST:
+            min_rest_hours = booking_model._get_min_rest_hours()
+
+        previous_by_task = self._find_previous_shift_tasks()
+        previous_tasks = {
+            task.id: task for task in self.browse(set(previous_by_task.values()))
+        }
+
+        # Группируем задачи по набору исполнителей предыдущей смены (None — без переноса)
+        task_ids_by_employees = defaultdict(list)
+        for task in self:
+            previous_task = previous_tasks.get(previous_by_task.get(task.id))
+            if not previous_task or previous_task.stage_id != stage_completed:
+                continue
+            employees_key = tuple(sorted(previous_task.employee_ids.ids))
+            if min_rest_hours is not None and employees_key and booking_model._is_rest_too_short(
+                previous_task, task, min_rest_hours
+            ):
+                employees_key = None
+            task_ids_by_employees[employees_key].append(task.id)
+
+        actual_time = fields.Datetime.now()
+        taken_ids = []
+        for employee_ids, task_ids in task_ids_by_employees.items():
+            vals = {
+                "stage_id": stage_in_progress.id,
+                "actual_start_time": actual_time,
+                "actual_end_time": actual_time,
+            }
+            if employee_ids is not None:
+                vals["employee_ids"] = [(6, 0, list(employee_ids))]
+            self.browse(task_ids).write(vals)
+            taken_ids.extend(task_ids)
+
+        return self.browse(taken_ids)
+
+    def _post_auto_take_summary(self):
+        """Одно сводное сообщение в расписание вместо истории по каждой задаче"""
+        task_ids_by_schedule = defaultdict(list)
+        for task in self.filtered("schedule_id"):
+            task_ids_by_schedule[task.schedule_id].append(task.id)
+
+        for schedule, task_ids in task_ids_by_schedule.items():
+            schedule.message_post(
+                body=f"Автоматически взято в работу задач: {len(task_ids)}"
+            )
+
+    def _find_previous_shift_tasks(self):
+        """
+        Находит задачи предыдущих смен для всего набора одним запросом
+        по индексу project_task_shift_chain_idx.
+        Возвращает словарь {id задачи: id задачи предыдущей смены}.
+        Пустые цех и тип процесса сравниваются как значения (как в домене с False).
+        """
+        tasks = self.filtered(lambda t: isinstance(t.id, int) and t.date_start)
+        if not tasks:
+            return {}
 
-        today_tasks = self.search(
-            [
-                ("date_start", ">=", today_start),
-                ("date_start", "<=", today_end),
-                ("stage_id", "=", self.env.ref("custom_project.project_task_stage_planned").id),
-                ("auto_tracking", "=", True),
-            ]
+        self.flush_model(
+            ["project_id", "process_type", "custom_task_type_id", "date_start", "active"]
+        )
+        self.env.cr.execute(
+            f"""
+            SELECT cur.id, prev.id
+              FROM project_task cur
+             CROSS JOIN LATERAL (
+                    SELECT p.id
+                      FROM project_task p
+                     WHERE {self._shift_chain_key_condition("p", "cur")}
+                       AND p.date_start < cur.date_start
+                       AND p.id != cur.id
+                       AND p.active
+                  ORDER BY p.date_start DESC
+                     LIMIT 1
+                   ) prev
+             WHERE cur.id IN %s
+            """,
+            [tuple(tasks.ids)],
         )
+        return dict(self.env.cr.fetchall())
 
-        tasks_auto_taken = []
+    @api.model
+    def _shift_chain_key_condition(self, alias, other_alias):
+        """Равенство ключей цепочки смен в форме выражений индекса project_task_shift_chain_idx"""
+        return " AND ".join(
+            f"{expr.format(alias=alias + '.')} = {expr.format(alias=other_alias + '.')}"
+            for expr in SHIFT_CHAIN_KEY_SQL
+        )
 
-        for task in today_tasks:
-            if self._should_auto_take_task(task):
-                # Находим предыдущую сменную задачу
-                previous_shift_task = self._find_previous_shift_task(task)
+    def _find_next_shift_tasks(self):
+        """
+        Находит задачи следующих смен для набора одним запросом
+        (обход индекса project_task_shift_chain_idx по возрастанию date_start).
+        Возвращает словарь {id задачи: id задачи следующей смены}.
+        Пустые цех и тип процесса сравниваются как значения, как у предыдущих смен.
+        """
+        tasks = self.filtered(lambda t: isinstance(t.id, int) and t.date_start)
+        if not tasks:
+            return {}
 
-                # Берем исполнителей из предыдущей задачи
-                employee_ids = (
-                    [(6, 0, previous_shift_task.employee_ids.ids)] if previous_shift_task else []
-                )
+        self.flush_model(
+            ["project_id", "process_type", "custom_task_type_id", "date_start", "active"]
+        )
+        self.env.cr.execute(
+            f"""
+            SELECT cur.id, nxt.id
+              FROM project_task cur
+             CROSS JOIN LATERAL (
+                    SELECT n.id
+                      FROM project_task n
+                     WHERE {self._shift_chain_key_condition("n", "cur")}
+                       AND n.date_start > cur.date_start
+                       AND n.id != cur.id
+                       AND n.active
+                  ORDER BY n.date_start ASC
+                     LIMIT 1
+                   ) nxt
+             WHERE cur.id IN %s
+            """,
+            [tuple(tasks.ids)],
+        )
+        return dict(self.env.cr.fetchall())
 
-                actual_time = fields.Datetime.now()
+    @api.model
+    def search_read_keyset(self, domain=None, field_names=None, after=None, limit=KEYSET_PAGE_SIZE):
+        """
+        Постраничное чтение задач по ключу (date_start, id) вместо OFFSET.
+        after — ключ последней записи предыдущей страницы: [date_start, id].
+        Возвращает {"records": [...], "next": ключ следующей страницы или False}.
+        """
+        tasks = self._search_keyset(domain or [], after=after, limit=limit)
+        next_key = False
+        if limit and len(tasks) == limit:
+            last_task = tasks[-1]
+            next_key = [fields.Datetime.to_string(last_task.date_start), last_task.id]
+        return {
+            "records": tasks.read(field_names) if tasks else [],
+            "next": next_key,
+        }
 
-                task.write(
-                    {
-                        "employee_ids": employee_ids,
-                        "stage_id": self.env.ref("custom_project.project_task_stage_in_progress").id,
-                        "actual_start_time": actual_time,
-                        "actual_end_time": actual_time,
-                    }
-                )
-                tasks_auto_taken.append(task)
+    @api.model
+    def _search_keyset(self, domain, after=None, limit=KEYSET_PAGE_SIZE):
+        """Поиск задач, следующих за ключом after, в порядке (date_start, id)"""
+        self._flush_search(domain, order="date_start, id")
+        query = self._where_calc(domain)
+        self._apply_ir_rules(query, "read")
+        if after:
+            after_date, after_id = after
+            query.add_where(
+                f'("{self._table}"."date_start", "{self._table}"."id") > (%s, %s)',
+                [fields.Datetime.to_datetime(after_date), int(after_id)],
+            )
+        query.order = f'"{self._table}"."date_start", "{self._table}"."id"'
+        query.limit = limit
+        query_str, params = query.select(f'"{self._table}"."id"')
+        self.env.cr.execute(query_str, params)
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
 
-        _logger.info(
-            f"Автоматически взяты в работу задачи: "
-            f"{[f'ID: {task.id}' for task in tasks_auto_taken]}"
+    @api.model
+    def get_calendar_etag(self, domain):
+        """
+        Версия данных календаря для домена: количество задач, последняя
+        запись и максимальный id (ловит удаления и пересоздания) одним запросом.
+        Названия цехов, стадий и смен входят в ответ, поэтому учитывается
+        и последняя запись в их таблицах.
+        """
+        self._flush_search(domain, fields=["write_date"])
+        for model_name in ("project.project", "project.task.type", "custom_project.shift"):
+            self.env[model_name].flush_model(["write_date"])
+        query = self._where_calc(domain)
+        self._apply_ir_rules(query, "read")
+        related_writes = ", ".join(f"(SELECT MAX(write_date) FROM {table})" for table in CALENDAR_RELATED_TABLES)
+        query_str, params = query.select(
+            f'COUNT(*), MAX("{self._table}"."write_date"), MAX("{self._table}"."id"), {related_writes}'
         )
-
-    def _should_auto_take_task(self, task):
-        """Проверяет, должна ли задача быть автоматически взята в работу"""
-        previous_task = self._find_previous_shift_task(task)
-        if not previous_task:
-            return False
-
-        completed_stage = self.env.ref("custom_project.project_task_stage_completed")
-        return previous_task.stage_id == completed_stage
-
-    def _find_previous_shift_task(self, current_task):
-        """Находит задачу предыдущей смены"""
-        if not current_task.date_start:
-            return False
-
-        # Для металлургии смена обычно 8 часов
-        hours_per_shift = 8
-        previous_time = current_task.date_start - timedelta(hours=hours_per_shift)
-
-        return self.search(
-            [
-                ("project_id", "=", current_task.project_id.id),
-                ("process_type", "=", current_task.process_type),
-                ("custom_task_type_id", "=", current_task.custom_task_type_id.id),
-                ("date_start", "<", current_task.date_start),
-                ("id", "!=", current_task.id),
-            ],
-            limit=1,
-            order="date_start desc",
+        self.env.cr.execute(query_str, params)
+        count, last_write, max_id, *related_last_writes = self.env.cr.fetchone()
+        version = (
+            f"{self.env.uid}:{self.env.lang}:{domain}:{count}:{last_write}:{max_id}:"
+            f"{':'.join(map(str, related_last_writes))}"
         )
+        return hashlib.sha1(version.encode()).hexdigest()
+
+    @api.model
+    def get_calendar_buckets(self, domain):
+        """
+        Задачи календаря только с хранимыми полями, сгруппированные
+        {день: {id смены: [задачи]}}; задачи без смены — под ключом "none".
+        Заголовок события (display_name) — название задачи.
+        """
+        buckets = defaultdict(lambda: defaultdict(list))
+        for record in self.search_read(domain, CALENDAR_FIELDS, order="date_start, id"):
+            record["display_name"] = record["name"]
+            day = fields.Date.to_string(record["date_start"].date()) if record["date_start"] else "none"
+            shift_key = str(record["shift"][0]) if record["shift"] else "none"
+            buckets[day][shift_key].append(record)
+        return {day: dict(day_buckets) for day, day_buckets in buckets.items()}
+
+    @api.model
+    def _iter_export_rows(self, domain, page_size=EXPORT_PAGE_SIZE):
+        """
+        Строки выгрузки задач страницами по ключу (date_start, id).
+        Исполнители, цеха, типы работ и последние акты ОТК страницы читаются
+        пакетно, после страницы кэш сбрасывается — память не зависит от периода.
+        Сначала выгружаются задачи из архива (они старше рабочих), если домен
+        применим к архиву; иначе в выгрузку попадают только рабочие задачи.
+        """
+        domain = list(domain) + [("date_start", "!=", False)]
+        archive_model = self.env["custom_project.task.archive"]
+        archive_domain = archive_model._from_task_domain(domain)
+        if archive_domain is None:
+            _logger.info("Отбор выгрузки не применим к архиву задач, архив не выгружается: %s", domain)
+        elif archive_model.check_access_rights("read", raise_exception=False):
+            yield from archive_model._iter_export_rows(archive_domain, page_size)
+        shifts_by_id = self.env["custom_project.shift"]._get_shift_registry()["by_id"]
+        process_labels = dict(self._fields["process_type"]._description_selection(self.env))
+        status_labels = dict(self._fields["quality_status"]._description_selection(self.env))
+
+        after = None
+        while True:
+            tasks = self._search_keyset(domain, after=after, limit=page_size)
+            if not tasks:
+                break
+
+            # Пакетная подгрузка связей страницы
+            tasks.mapped("employee_ids.name")
+            tasks.mapped("last_quality_control_id.name")
+            tasks.mapped("project_id.name")
+            tasks.mapped("custom_task_type_id.name")
+            tasks.mapped("stage_id.name")
+
+            for task in tasks:
+                shift = shifts_by_id.get(task.shift.id)
+                yield [
+                    task.date_start,
+                    shift.name if shift else "",
+                    task.project_id.name or "",
+                    task.name,
+                    task.custom_task_type_id.name or "",
+                    process_labels.get(task.process_type, ""),
+                    task.stage_id.name or "",
+                    ", ".join(task.employee_ids.mapped("name")),
+                    task.people_fact,
+                    task.material_consumption_kg,
+                    status_labels.get(task.quality_status, ""),
+                    task.last_quality_control_id.name or "",
+                    task.actual_start_time or "",
+                    task.actual_end_time or "",
+                ]
+
+            after = (tasks[-1].date_start, tasks[-1].id)
+            self.env.invalidate_all()
 
     @api.model
     def _adjust_date_start_for_shift(self, now, shift):
@@ -218,21 +818,43 @@ class ProjectTask(models.Model):
         return now.replace(hour=shift.start_hour, minute=0, second=0,
                            microsecond=0)
 
-    @api.depends("quality_control_ids")
-    def _compute_has_quality_control(self):
-        for task in self:
-            task.has_quality_control = bool(task.quality_control_ids)
-
-    @api.depends("quality_control_ids.status")
-    def _compute_quality_status(self):
+    @api.depends("quality_control_ids", "quality_control_ids.status")
+    @instrumented()
+    def _compute_quality_summary(self):
+        """
+        Последний акт ОТК, статус контроля качества и признак наличия контроля
+        для всего набора одним запросом «последний акт по задаче».
+        """
+        latest_controls = self._get_latest_quality_controls()
         for task in self:
-            if not task.quality_control_ids:
-                task.quality_status = "pending"
-                continue
-
-            # Берем последний контроль качества
-            last_control = task.quality_control_ids.sorted(key=lambda r: r.id, reverse=True)[0]
-            task.quality_status = last_control.status
+            if isinstance(task.id, int):
+                control_id, status = latest_controls.get(task.id, (False, False))
+            else:
+                # Несохранённая задача (onchange): берём акты из памяти
+                controls = task.quality_control_ids.sorted(key=lambda r: r.id, reverse=True)
+                control_id, status = (controls[0].id, controls[0].status) if controls else (False, False)
+
+            task.last_quality_control_id = control_id
+            task.has_quality_control = bool(control_id)
+            task.quality_status = status or "pending"
+
+    def _get_latest_quality_controls(self):
+        """Возвращает {id задачи: (id последнего акта ОТК, статус)}"""
+        task_ids = tuple(task_id for task_id in self.ids if isinstance(task_id, int))
+        if not task_ids:
+            return {}
+
+        self.env["quality.control"].flush_model(["task_id", "status"])
+        self.env.cr.execute(
+            """
+            SELECT DISTINCT ON (task_id) task_id, id, status
+              FROM quality_control
+             WHERE task_id IN %s
+          ORDER BY task_id, id DESC
+            """,
+            [task_ids],
+        )
+        return {task_id: (control_id, status) for task_id, control_id, status in self.env.cr.fetchall()}
 
     @api.depends("shift_number", "date_start")
     def _compute_production_cycle(self):
@@ -242,11 +864,12 @@ class ProjectTask(models.Model):
             else:
                 record.production_cycle = f"Цикл {record.shift_number}"
 
-    @api.depends("shift")
+    @api.depends("shift", "shift.code")
     def _compute_shift_color(self):
-        shift_colors = {"morning": 10, "day": 3, "night": 0}
+        shifts_by_id = self.env["custom_project.shift"]._get_shift_registry()["by_id"]
         for record in self:
-            record.shift_color = shift_colors.get(record.shift.code, 0)
+            shift = shifts_by_id.get(record.shift.id)
+            record.shift_color = SHIFT_COLORS.get(shift.code, 0) if shift else 0
 
     def action_delete_series(self):
         """Удаление серии через расписание"""
@@ -9,4 +9,11 @@ class ProjectTaskTypeCustom(models.Model):
         ("maintenance", "Техническое обслуживание"),
     ], string="Тип процесса", required=True)
     
-    category = fields.Char(string="Категория")
\ No newline at end of file
+    category = fields.Char(string="Категория")
+
+    def write(self, vals):
+        res = super().write(vals)
+        if "name" in vals:
+            # Названия типов работ хранятся в кэше шаблонов расписания
+            self.clear_caches()
+        return res
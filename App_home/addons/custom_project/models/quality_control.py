@@ -1,4 +1,21 @@
-from odoo import fields, models
+import csv
+import io
+import json
+import logging
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+import numpy as np
+
+from ..instrumentation import instrumented
+from .quality_control_measurement import LIMIT_FLAGS
+
+_logger = logging.getLogger(__name__)
+
+# Размер порции актов при потоковом импорте
+IMPORT_CHUNK_SIZE = 1000
+# Сколько ошибок строк сохранять в отчёте импорта
+IMPORT_MAX_ERRORS = 100
 
 class QualityControl(models.Model):
     _name = "quality.control"
@@ -22,9 +39,343 @@ class QualityControl(models.Model):
     
     product_batch = fields.Char(string="Партия продукции")
     certificate_number = fields.Char(string="Номер сертификата")
+
+    measurement_ids = fields.One2many(
+        "quality.control.measurement", "quality_control_id", string="Измерения"
+    )
     
     def action_accept(self):
         self.status = 'accepted'
         
     def action_reject(self):
-        self.status = 'rejected'
\ No newline at end of file
+        self.status = 'rejected'
+
+    @api.model
+    @instrumented(rows=lambda records, result: result["imported"])
+    def import_inspection_stream(self, stream, file_format="csv", delimiter=","):
+        """
+        Потоковый импорт результатов контроля из CSV или JSON lines.
+        stream — бинарный файловый объект, строки читаются по одной.
+        Ссылки на задачи, контролёров и партии разрешаются через словари,
+        акты создаются порциями, статус качества задач пересчитывается один раз в конце.
+        Возвращает {"imported": n, "errors": [(номер строки, сообщение)]}.
+        """
+        task_model = self.env["project.task"]
+        task_fields = [
+            task_model._fields[name]
+            for name in ("quality_status", "has_quality_control", "last_quality_control_id")
+        ]
+        lookups = self._build_import_lookups()
+        imported = 0
+        errors = []
+        affected_task_ids = set()
+        rows = []
+
+        def import_rows():
+            self._prefetch_import_tasks([row for _line_number, row in rows], lookups)
+            vals_list = []
+            for line_number, row in rows:
+                try:
+                    vals_list.append(self._prepare_import_vals(row, lookups))
+                except (ValueError, TypeError, KeyError) as e:
+                    if len(errors) < IMPORT_MAX_ERRORS:
+                        errors.append((line_number, str(e)))
+            if not vals_list:
+                return 0
+
+            controls = self.create(vals_list)
+            tasks = controls.task_id
+            affected_task_ids.update(tasks.ids)
+            # Статус качества пересчитаем один раз по всем задачам в конце
+            for field in task_fields:
+                self.env.remove_to_compute(field, tasks)
+            self.env.flush_all()
+            self.env.invalidate_all()
+            return len(controls)
+
+        for line_number, row in self._iter_import_rows(stream, file_format, delimiter):
+            rows.append((line_number, row))
+            if len(rows) >= IMPORT_CHUNK_SIZE:
+                imported += import_rows()
+                rows = []
+        if rows:
+            imported += import_rows()
+
+        affected_tasks = task_model.browse(sorted(affected_task_ids))
+        for field in task_fields:
+            self.env.add_to_compute(field, affected_tasks)
+        affected_tasks.flush_recordset([field.name for field in task_fields])
+
+        _logger.info(
+            "Импорт актов ОТК: создано %s, задач пересчитано %s, ошибок %s",
+            imported, len(affected_tasks), len(errors),
+        )
+        return {"imported": imported, "errors": errors}
+
+    @api.model
+    def _iter_import_rows(self, stream, file_format, delimiter=","):
+        """Построчное чтение файла импорта: (номер строки, словарь значений)"""
+        if file_format == "csv":
+            text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+            reader = csv.DictReader(text, delimiter=delimiter)
+            for row in reader:
+                yield reader.line_num, row
+        elif file_format == "jsonl":
+            text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+            for line_number, line in enumerate(text, start=1):
+                line = line.strip()
+                if line:
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        yield line_number, None
+        else:
+            raise UserError(f"Неподдерживаемый формат файла: {file_format}")
+
+    @api.model
+    def _build_import_lookups(self):
+        """Словари разрешения ссылок, строятся один раз на файл"""
+        inspectors = {}
+        for employee in self.env["hr.employee"].search_read([], ["name", "barcode"]):
+            inspectors[employee["name"]] = employee["id"]
+            if employee["barcode"]:
+                inspectors[employee["barcode"]] = employee["id"]
+
+        self.flush_model(["product_batch", "task_id"])
+        self.env.cr.execute(
+            """
+            SELECT DISTINCT ON (product_batch) product_batch, task_id
+              FROM quality_control
+             WHERE product_batch IS NOT NULL
+          ORDER BY product_batch, id DESC
+            """
+        )
+        return {
+            "inspectors": inspectors,
+            "batches": dict(self.env.cr.fetchall()),
+            # Заполняется порциями строк: id задачи -> существует ли
+            "tasks": {},
+        }
+
+    @api.model
+    def _prefetch_import_tasks(self, rows, lookups):
+        """Проверка ссылок на задачи порции строк одним поиском"""
+        task_ids = set()
+        for row in rows:
+            if isinstance(row, dict) and row.get("task_id"):
+                try:
+                    task_ids.add(int(row["task_id"]))
+                except (TypeError, ValueError):
+                    continue
+        known_tasks = lookups["tasks"]
+        task_ids.difference_update(known_tasks)
+        if not task_ids:
+            return
+
+        existing_ids = set(
+            self.env["project.task"].with_context(active_test=False).search([("id", "in", list(task_ids))]).ids
+        )
+        known_tasks.update((task_id, task_id in existing_ids) for task_id in task_ids)
+
+    @api.model
+    def _resolve_import_task(self, task_ref, lookups):
+        """Ссылка на задачу по словарю, заполненному _prefetch_import_tasks"""
+        task_id = int(task_ref)
+        return task_id if lookups["tasks"].get(task_id) else None
+
+    @api.model
+    def _prepare_import_vals(self, row, lookups):
+        """Значения акта ОТК из строки файла; ValueError — строка отклоняется"""
+        if not isinstance(row, dict):
+            raise ValueError("Строка не является объектом JSON")
+
+        batch = (row.get("product_batch") or "").strip() or False
+        task_id = None
+        if row.get("task_id"):
+            task_id = self._resolve_import_task(row["task_id"], lookups)
+        elif batch:
+            task_id = lookups["batches"].get(batch)
+        if not task_id:
+            raise ValueError("Не найдена производственная задача")
+
+        inspector_id = lookups["inspectors"].get((row.get("inspector") or "").strip())
+        if not inspector_id:
+            raise ValueError(f"Не найден контролёр ОТК: {row.get('inspector')}")
+
+        status = row.get("status") or "pending"
+        if status not in dict(self._fields["status"].selection):
+            raise ValueError(f"Неизвестный результат контроля: {status}")
+
+        if not row.get("name"):
+            raise ValueError("Не указан номер акта")
+
+        vals = {
+            "name": row["name"],
+            "task_id": task_id,
+            "inspector_id": inspector_id,
+            "status": status,
+            "product_batch": batch,
+            "certificate_number": row.get("certificate_number") or False,
+            "parameters": row.get("parameters") or False,
+            "notes": row.get("notes") or False,
+            "measurement_data": row.get("measurement_data") or False,
+        }
+        if row.get("inspection_datetime"):
+            vals["inspection_datetime"] = fields.Datetime.to_datetime(row["inspection_datetime"])
+        if row.get("measurements"):
+            vals["measurement_ids"] = [
+                (0, 0, self._prepare_import_measurement_vals(measurement))
+                for measurement in row["measurements"]
+            ]
+
+        # Партия из файла сразу доступна следующим строкам
+        if batch:
+            lookups["batches"][batch] = task_id
+        return vals
+
+    @api.model
+    def _prepare_import_measurement_vals(self, measurement):
+        """Значения измерения; признак границы допуска ставится только для указанных в файле"""
+        vals = {
+            "parameter": measurement["parameter"],
+            "value": float(measurement["value"]),
+            "unit": measurement.get("unit") or False,
+        }
+        for limit, flag in LIMIT_FLAGS.items():
+            has_limit = measurement.get(limit) is not None
+            vals[flag] = has_limit
+            if has_limit:
+                vals[limit] = float(measurement[limit])
+        return vals
+
+    @api.model
+    def get_spc_statistics(self, domain=None):
+        """
+        Статистика SPC по партиям и параметрам для актов, найденных по домену,
+        включая перенесённые в архив, если домен применим к архиву
+        """
+        domain = domain or []
+        archive_model = self.env["custom_project.quality.control.archive"]
+        archive_domain = archive_model._from_control_domain(domain)
+        archived_controls = archive_model.browse()
+        if archive_domain is None:
+            _logger.info("Отбор SPC не применим к архиву актов, архив не учитывается: %s", domain)
+        elif archive_model.check_access_rights("read", raise_exception=False):
+            archived_controls = archive_model.search(archive_domain)
+        return self.search(domain)._compute_spc_statistics(archived_controls)
+
+    @instrumented()
+    def _compute_spc_statistics(self, archived_controls=None):
+        """
+        Статистика SPC по партиям и параметрам измерений набора актов
+        и архивных актов archived_controls (измерения из measurements_json):
+        среднее, сигма, контрольные границы ±3σ, Cp/Cpk и число выходов
+        за контрольные границы и допуск. Значения выбираются массивами
+        одним запросом, расчёт векторный.
+        В качестве границ допуска берутся самые строгие из заданных в измерениях
+        (has_lower_limit/has_upper_limit), незаданные границы приходят как NULL.
+        """
+        archived_ids = archived_controls.ids if archived_controls else []
+        if not self.ids and not archived_ids:
+            return []
+
+        self.env["quality.control.measurement"].flush_model()
+        self.flush_model(["product_batch", "inspection_datetime"])
+        self.env["custom_project.quality.control.archive"].flush_model(
+            ["product_batch", "inspection_datetime", "measurements_json"]
+        )
+        self.env.cr.execute(
+            """
+            WITH measurements AS (
+                SELECT q.product_batch,
+                       m.parameter,
+                       m.unit,
+                       m.value::float8 AS value,
+                       CASE WHEN m.has_lower_limit THEN m.lower_limit::float8 END AS lower_limit,
+                       CASE WHEN m.has_upper_limit THEN m.upper_limit::float8 END AS upper_limit,
+                       q.inspection_datetime,
+                       m.id AS seq
+                  FROM quality_control_measurement m
+                  JOIN quality_control q ON q.id = m.quality_control_id
+                 WHERE q.id = ANY(%s)
+             UNION ALL
+                SELECT a.product_batch,
+                       e.item->>'parameter',
+                       e.item->>'unit',
+                       (e.item->>'value')::float8,
+                       (e.item->>'lower_limit')::float8,
+                       (e.item->>'upper_limit')::float8,
+                       a.inspection_datetime,
+                       e.seq
+                  FROM custom_project_quality_control_archive a
+                 CROSS JOIN LATERAL jsonb_array_elements(a.measurements_json::jsonb)
+                       WITH ORDINALITY AS e(item, seq)
+                 WHERE a.id = ANY(%s)
+            )
+            SELECT product_batch,
+                   parameter,
+                   MAX(unit),
+                   ARRAY_AGG(value ORDER BY inspection_datetime, seq),
+                   ARRAY_AGG(lower_limit ORDER BY inspection_datetime, seq),
+                   ARRAY_AGG(upper_limit ORDER BY inspection_datetime, seq)
+              FROM measurements
+          GROUP BY product_batch, parameter
+          ORDER BY product_batch, parameter
+            """,
+            [self.ids, archived_ids],
+        )
+
+        statistics = []
+        for batch, parameter, unit, values, lower_limits, upper_limits in self.env.cr.fetchall():
+            values = np.asarray(values, dtype=float)
+            lower_limits = np.asarray(lower_limits, dtype=float)
+            upper_limits = np.asarray(upper_limits, dtype=float)
+
+            mean = float(values.mean())
+            sigma = float(values.std(ddof=1)) if values.size > 1 else 0.0
+            lcl, ucl = mean - 3 * sigma, mean + 3 * sigma
+            lsl = None if np.isnan(lower_limits).all() else float(np.nanmax(lower_limits))
+            usl = None if np.isnan(upper_limits).all() else float(np.nanmin(upper_limits))
+
+            # Сравнение с NaN ложно, поэтому пустые границы не дают нарушений
+            tolerance_violations = np.count_nonzero(
+                (values < lower_limits) | (values > upper_limits)
+            )
+            control_violations = np.count_nonzero((values < lcl) | (values > ucl))
+
+            statistics.append({
+                "product_batch": batch or False,
+                "parameter": parameter,
+                "unit": unit or "",
+                "count": int(values.size),
+                "mean": round(mean, 6),
+                "sigma": round(sigma, 6),
+                "lcl": round(lcl, 6),
+                "ucl": round(ucl, 6),
+                "lsl": lsl,
+                "usl": usl,
+                "cp": self._spc_cp(lsl, usl, sigma),
+                "cpk": self._spc_cpk(lsl, usl, mean, sigma),
+                "control_violations": int(control_violations),
+                "tolerance_violations": int(tolerance_violations),
+            })
+        return statistics
+
+    @api.model
+    def _spc_cp(self, lsl, usl, sigma):
+        """Индекс воспроизводимости Cp (нужны обе границы допуска)"""
+        if lsl is None or usl is None or not sigma:
+            return None
+        return round((usl - lsl) / (6 * sigma), 4)
+
+    @api.model
+    def _spc_cpk(self, lsl, usl, mean, sigma):
+        """Индекс Cpk, для одностороннего допуска — по имеющейся границе"""
+        if not sigma:
+            return None
+        indexes = []
+        if usl is not None:
+            indexes.append((usl - mean) / (3 * sigma))
+        if lsl is not None:
+            indexes.append((mean - lsl) / (3 * sigma))
+        return round(min(indexes), 4) if indexes else None
@@ -0,0 +1,57 @@
+from odoo import api, fields, models
+from odoo.tools import sql
+
+# Граница допуска -> признак того, что она задана
+LIMIT_FLAGS = {"lower_limit": "has_lower_limit", "upper_limit": "has_upper_limit"}
+
+
+class QualityControlMeasurement(models.Model):
+    _name = "quality.control.measurement"
+    _description = "Измерение контролируемого параметра"
+    _order = "quality_control_id, parameter, id"
+
+    quality_control_id = fields.Many2one(
+        "quality.control", string="Акт ОТК", required=True, ondelete="cascade", index=True
+    )
+
+    parameter = fields.Char(string="Параметр", required=True)
+    value = fields.Float(string="Значение", required=True, digits=(16, 6))
+    unit = fields.Char(string="Ед. изм.")
+
+    # Допуск: незаданная граница означает одностороннее требование.
+    # Пустое Float-поле хранится как 0.0, поэтому наличие границы хранится отдельно
+    lower_limit = fields.Float(string="Нижний допуск", digits=(16, 6))
+    upper_limit = fields.Float(string="Верхний допуск", digits=(16, 6))
+    has_lower_limit = fields.Boolean(string="Нижний допуск задан")
+    has_upper_limit = fields.Boolean(string="Верхний допуск задан")
+
+    product_batch = fields.Char(
+        related="quality_control_id.product_batch", string="Партия продукции", store=True
+    )
+
+    def init(self):
+        super().init()
+        # Выборка значений параметра по партии для SPC
+        sql.create_index(
+            self.env.cr,
+            "quality_control_measurement_batch_parameter_idx",
+            self._table,
+            ["product_batch", "parameter"],
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            self._set_limit_flags(vals)
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._set_limit_flags(vals)
+        return super().write(vals)
+
+    @api.model
+    def _set_limit_flags(self, vals):
+        """Переданная граница считается заданной, False/None — очищенной, если признак не указан явно"""
+        for limit, flag in LIMIT_FLAGS.items():
+            if limit in vals and flag not in vals:
+                vals[flag] = vals[limit] is not None and vals[limit] is not False
@@ -1,4 +1,9 @@
-from odoo import fields, models
+from collections import namedtuple
+
+from odoo import api, fields, models, tools
+
+# Неизменяемое описание смены для кэша
+ShiftInfo = namedtuple("ShiftInfo", "id code name start_hour end_hour active")
 
 class custom_projectShift(models.Model):
     _name = "custom_project.shift"
@@ -18,4 +23,45 @@ class custom_projectShift(models.Model):
     
     # Связи
     task_ids = fields.One2many("project.task", "shift", string="Задачи смены")
-    template_ids = fields.One2many("task.schedule.template", "shift", string="Шаблоны")
\ No newline at end of file
+    template_ids = fields.One2many("task.schedule.template", "shift", string="Шаблоны")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        shifts = super().create(vals_list)
+        self.clear_caches()
+        shifts._rebuild_shift_instances()
+        return shifts
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        if {"start_hour", "end_hour", "active"} & set(vals):
+            self._rebuild_shift_instances()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
+    def _rebuild_shift_instances(self):
+        """Пересобирает будущий календарь смен после изменения смен"""
+        self.env["custom_project.shift.instance"]._rebuild_from(fields.Date.context_today(self))
+
+    @api.model
+    @tools.ormcache()
+    def _get_shift_registry(self):
+        """
+        Кэш смен реестра, сбрасывается при create/write/unlink смен:
+        cycle — активные смены по часу начала, by_id — все смены.
+        Значения общие для всех вызовов, изменять их нельзя.
+        """
+        shifts = self.sudo().with_context(active_test=False).search([], order="start_hour, id")
+        infos = tuple(
+            ShiftInfo(shift.id, shift.code, shift.name, shift.start_hour, shift.end_hour, shift.active)
+            for shift in shifts
+        )
+        return {
+            "cycle": tuple(info for info in infos if info.active),
+            "by_id": {info.id: info for info in infos},
+        }
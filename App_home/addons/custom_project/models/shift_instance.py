@@ -0,0 +1,159 @@
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from odoo import api, fields, models
+from odoo.tools import sql
+
+# На сколько суток вперёд поддерживается календарь смен
+DEFAULT_INSTANCE_HORIZON_DAYS = 120
+
+
+class ShiftInstance(models.Model):
+    _name = "custom_project.shift.instance"
+    _description = "Конкретная смена в календаре"
+    _order = "start_datetime"
+
+    shift_id = fields.Many2one(
+        "custom_project.shift", string="Смена", required=True, ondelete="cascade"
+    )
+    date = fields.Date(string="Дата смены", required=True, index=True)
+    start_datetime = fields.Datetime(string="Начало", required=True)
+    end_datetime = fields.Datetime(string="Окончание", required=True)
+
+    _sql_constraints = [
+        ("shift_date_uniq", "unique(shift_id, date)", "Смена на эту дату уже есть в календаре!"),
+    ]
+
+    def init(self):
+        super().init()
+        # Поиск смены, содержащей момент времени
+        sql.create_index(
+            self.env.cr,
+            "custom_project_shift_instance_interval_idx",
+            self._table,
+            ["tsrange(start_datetime, end_datetime, '[)')"],
+            method="gist",
+        )
+        sql.create_index(
+            self.env.cr,
+            "custom_project_shift_instance_start_idx",
+            self._table,
+            ["start_datetime"],
+        )
+
+    @api.model
+    def _get_plant_tz(self):
+        """Часовой пояс, в котором заданы часы смен"""
+        tz_name = self.env["ir.config_parameter"].sudo().get_param("custom_project.plant_tz")
+        return pytz.timezone(tz_name or "UTC")
+
+    @api.model
+    def _local_to_utc(self, local_dt, tz=None):
+        """Местное время завода (naive) -> UTC (naive), как хранит ORM"""
+        tz = tz or self._get_plant_tz()
+        return tz.localize(local_dt, is_dst=False).astimezone(pytz.utc).replace(tzinfo=None)
+
+    @api.model
+    def _get_instance_bounds(self, shift, day, tz=None):
+        """Начало и конец смены в дату day (UTC); смена может переходить через полночь"""
+        start = datetime.combine(day, time(hour=shift.start_hour))
+        end = datetime.combine(day, time(hour=shift.end_hour % 24))
+        if end <= start:
+            end += timedelta(days=1)
+        return self._local_to_utc(start, tz), self._local_to_utc(end, tz)
+
+    @api.model
+    def _ensure_instances(self, date_from, date_to):
+        """Материализует недостающие смены за период [date_from, date_to]"""
+        # Календарь служебный: пополняется независимо от прав пользователя
+        instance_model = self.sudo()
+        shifts = self.env["custom_project.shift"]._get_shift_registry()["cycle"]
+        if not shifts or date_from > date_to:
+            return
+
+        existing = {
+            (row["shift_id"][0], row["date"])
+            for row in instance_model.search_read(
+                [("date", ">=", date_from), ("date", "<=", date_to)], ["shift_id", "date"]
+            )
+        }
+        tz = self._get_plant_tz()
+        vals_list = []
+        day = date_from
+        while day <= date_to:
+            for shift in shifts:
+                if (shift.id, day) in existing:
+                    continue
+                start, end = self._get_instance_bounds(shift, day, tz)
+                vals_list.append({
+                    "shift_id": shift.id,
+                    "date": day,
+                    "start_datetime": start,
+                    "end_datetime": end,
+                })
+            day += timedelta(days=1)
+
+        if vals_list:
+            instance_model.create(vals_list)
+
+    @api.model
+    def _locate_many(self, datetimes):
+        """Смены, содержащие моменты времени: {момент: id смены}, одним запросом"""
+        datetimes = sorted({dt for dt in datetimes if dt})
+        if not datetimes:
+            return {}
+
+        self.flush_model(["start_datetime", "end_datetime"])
+        self.env.cr.execute(
+            """
+            SELECT moment.ts, instance.id
+              FROM unnest(%s::timestamp[]) AS moment(ts)
+             CROSS JOIN LATERAL (
+                    SELECT i.id
+                      FROM custom_project_shift_instance i
+                     WHERE tsrange(i.start_datetime, i.end_datetime, '[)') @> moment.ts
+                  ORDER BY i.start_datetime DESC
+                     LIMIT 1
+                   ) instance
+            """,
+            [datetimes],
+        )
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _rebuild_from(self, date_from):
+        """
+        Пересоздаёт календарь начиная с даты (после изменения смен).
+        Календарь восстанавливается на горизонт, но не короче последней задачи плана:
+        план может быть длиннее горизонта (до MAX_PLANNING_DAYS)
+        """
+        self.sudo().search([("date", ">=", date_from)]).unlink()
+
+        tasks = self.env["project.task"].sudo().with_context(active_test=False).search(
+            [("date_start", ">=", datetime.combine(date_from, time.min))], order="date_start"
+        )
+        date_to = date_from + timedelta(days=self._get_horizon_days())
+        if tasks:
+            # Запас в сутки: смена по местному времени может относиться к соседней дате
+            date_to = max(date_to, tasks[-1].date_start.date() + timedelta(days=1))
+        self._ensure_instances(date_from, date_to)
+
+        # Задачи этого периода заново привязываем к сменам календаря
+        self.env.add_to_compute(tasks._fields["shift_instance_id"], tasks)
+
+    @api.model
+    def _get_horizon_days(self):
+        return int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "custom_project.shift_instance_horizon_days", DEFAULT_INSTANCE_HORIZON_DAYS
+            )
+        )
+
+    @api.model
+    def _cron_materialize_shift_instances(self):
+        """CRON задача: поддерживает календарь смен на горизонт вперёд"""
+        today = fields.Date.context_today(self)
+        self._ensure_instances(
+            today - timedelta(days=1), today + timedelta(days=self._get_horizon_days())
+        )
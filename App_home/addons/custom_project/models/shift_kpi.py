@@ -0,0 +1,196 @@
+import threading
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+# Время жизни закэшированных KPI по умолчанию, секунд
+DEFAULT_KPI_CACHE_TTL = 300
+# Допустимое опоздание начала работы по умолчанию, минут
+DEFAULT_ON_TIME_GRACE_MINUTES = 15
+
+# Измерения группировки KPI: выражение SQL и модель для названий
+KPI_GROUPINGS = {
+    "shift": ("t.shift", "custom_project.shift"),
+    "task_type": ("t.custom_task_type_id", "project.task.type"),
+    "project": ("t.project_id", "project.project"),
+}
+
+# Кэш результатов: {(база, параметры): (момент устаревания, результат)}
+_kpi_cache = {}
+_kpi_cache_lock = threading.Lock()
+
+
+class ShiftKpi(models.AbstractModel):
+    _name = "custom_project.shift.kpi"
+    _description = "Показатели план/факт по сменам"
+
+    @api.model
+    def get_kpis(self, date_from, date_to, group_by="shift", project_ids=None):
+        """
+        KPI план/факт за период [date_from, date_to) в разрезе смены, типа работы или цеха:
+        количество работ, средняя и 90-я перцентиль задержки начала, перерасход времени,
+        доля начатых вовремя, загрузка (факт/план) и средний разрыв передачи смены.
+        Учитываются только задачи, доступные пользователю по правилам доступа,
+        включая перенесённые в архив.
+        Расчёт выполняется в базе, результат кэшируется на время TTL
+        отдельно для пользователя и набора компаний.
+        """
+        if group_by not in KPI_GROUPINGS:
+            raise UserError(f"Неизвестная группировка KPI: {group_by}")
+
+        date_from = fields.Datetime.to_datetime(date_from)
+        date_to = fields.Datetime.to_datetime(date_to)
+        project_ids = tuple(sorted(project_ids or ()))
+        self.env["project.task"].check_access_rights("read")
+        cache_key = (
+            self.env.cr.dbname, self.env.uid, tuple(self.env.companies.ids),
+            date_from, date_to, group_by, project_ids,
+        )
+
+        now = time.monotonic()
+        with _kpi_cache_lock:
+            cached = _kpi_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        result = self._compute_kpis(date_from, date_to, group_by, project_ids)
+        with _kpi_cache_lock:
+            # Заодно выбрасываем устаревшие записи
+            for key in [key for key, (expires, _result) in _kpi_cache.items() if expires <= now]:
+                del _kpi_cache[key]
+            _kpi_cache[cache_key] = (now + self._get_cache_ttl(), result)
+        return result
+
+    @api.model
+    def _get_cache_ttl(self):
+        return int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "custom_project.kpi_cache_ttl", DEFAULT_KPI_CACHE_TTL
+            )
+        )
+
+    @api.model
+    def _compute_kpis(self, date_from, date_to, group_by, project_ids):
+        group_expr, group_model = KPI_GROUPINGS[group_by]
+        grace_minutes = int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "custom_project.kpi_on_time_grace_minutes", DEFAULT_ON_TIME_GRACE_MINUTES
+            )
+        )
+        task_query, task_params = self._get_task_query(date_from, date_to, project_ids)
+        archive_query, archive_params = self._get_archive_query(date_from, date_to, project_ids)
+
+        self.env["project.task"].flush_model()
+        self.env["custom_project.task.archive"].flush_model()
+        self.env.cr.execute(
+            f"""
+            WITH task_source AS (
+                SELECT t.id, t.shift, t.project_id, t.process_type, t.custom_task_type_id,
+                       t.date_start, t.actual_start_time, t.actual_end_time,
+                       COALESCE(si.end_datetime, (t.date_deadline + 1)::timestamp) AS planned_end
+                  FROM project_task t
+             LEFT JOIN custom_project_shift_instance si ON si.id = t.shift_instance_id
+                 WHERE t.id IN ({task_query})
+             UNION ALL
+                -- Задачи старше горизонта архива
+                SELECT a.original_id, a.shift_id, a.project_id, a.process_type, a.custom_task_type_id,
+                       a.date_start, a.actual_start_time, a.actual_end_time, a.planned_end
+                  FROM custom_project_task_archive a
+                 WHERE a.id IN ({archive_query})
+            ), task_times AS (
+                SELECT {group_expr} AS group_id,
+                       t.date_start,
+                       t.actual_start_time,
+                       t.actual_end_time,
+                       t.planned_end,
+                       -- Разрыв между завершением предыдущей смены и началом этой работы
+                       t.actual_start_time - LAG(t.actual_end_time) OVER (
+                           PARTITION BY t.project_id, t.process_type, t.custom_task_type_id
+                           ORDER BY t.date_start, t.id
+                       ) AS handover_gap
+                  FROM task_source t
+            ), task_kpi AS (
+                SELECT group_id,
+                       EXTRACT(EPOCH FROM actual_start_time - date_start) / 60 AS start_delay,
+                       EXTRACT(EPOCH FROM actual_end_time - planned_end) / 60 AS overrun,
+                       EXTRACT(EPOCH FROM actual_end_time - actual_start_time) AS actual_seconds,
+                       CASE WHEN actual_start_time IS NOT NULL AND actual_end_time IS NOT NULL
+                            THEN EXTRACT(EPOCH FROM planned_end - date_start) END AS planned_seconds,
+                       EXTRACT(EPOCH FROM handover_gap) / 60 AS handover_gap
+                  FROM task_times
+            )
+            SELECT group_id,
+                   COUNT(*) AS task_count,
+                   COUNT(start_delay) AS started_count,
+                   AVG(start_delay) AS avg_start_delay,
+                   PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY start_delay) AS p90_start_delay,
+                   AVG(overrun) AS avg_overrun,
+                   COUNT(*) FILTER (WHERE start_delay <= %s) AS on_time_count,
+                   SUM(actual_seconds) AS actual_seconds,
+                   SUM(planned_seconds) AS planned_seconds,
+                   AVG(handover_gap) AS avg_handover_gap
+              FROM task_kpi
+          GROUP BY group_id
+          ORDER BY group_id
+            """,
+            task_params + archive_params + [grace_minutes],
+        )
+        rows = self.env.cr.dictfetchall()
+
+        group_ids = [row["group_id"] for row in rows if row["group_id"]]
+        names = dict(self.env[group_model].browse(group_ids).sudo().name_get())
+
+        def rounded(value):
+            return round(float(value), 2) if value is not None else None
+
+        return [
+            {
+                "group_id": row["group_id"] or False,
+                "group_name": names.get(row["group_id"], "—"),
+                "task_count": row["task_count"],
+                "started_count": row["started_count"],
+                "avg_start_delay_min": rounded(row["avg_start_delay"]),
+                "p90_start_delay_min": rounded(row["p90_start_delay"]),
+                "avg_overrun_min": rounded(row["avg_overrun"]),
+                "on_time_ratio": rounded(row["on_time_count"] / row["started_count"])
+                if row["started_count"] else None,
+                "utilization": rounded(row["actual_seconds"] / row["planned_seconds"])
+                if row["planned_seconds"] else None,
+                "avg_handover_gap_min": rounded(row["avg_handover_gap"]),
+            }
+            for row in rows
+        ]
+
+    @api.model
+    def _get_task_query(self, date_from, date_to, project_ids):
+        """Подзапрос id активных задач периода с учётом правил доступа (ir.rule, компании)"""
+        task_model = self.env["project.task"]
+        domain = [("active", "=", True), ("date_start", ">=", date_from), ("date_start", "<", date_to)]
+        if project_ids:
+            domain.append(("project_id", "in", list(project_ids)))
+        query = task_model._where_calc(domain)
+        task_model._apply_ir_rules(query, "read")
+        query_str, params = query.select('"project_task"."id"')
+        return query_str, list(params)
+
+    @api.model
+    def _get_archive_query(self, date_from, date_to, project_ids):
+        """Подзапрос id архивных задач периода, активных при архивации, с учётом правил доступа"""
+        archive_model = self.env["custom_project.task.archive"]
+        domain = [("was_active", "=", True), ("date_start", ">=", date_from), ("date_start", "<", date_to)]
+        if project_ids:
+            domain.append(("project_id", "in", list(project_ids)))
+        if not archive_model.check_access_rights("read", raise_exception=False):
+            domain = [(0, "=", 1)]
+        query = archive_model._where_calc(domain)
+        archive_model._apply_ir_rules(query, "read")
+        query_str, params = query.select('"custom_project_task_archive"."id"')
+        return query_str, list(params)
+
+    @api.model
+    def _get_default_period(self):
+        """Период отчёта по умолчанию — последние 30 суток"""
+        date_to = fields.Datetime.now()
+        return date_to - timedelta(days=30), date_to
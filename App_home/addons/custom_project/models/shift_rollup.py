@@ -0,0 +1,145 @@
+from odoo import api, fields, models
+
+# Поля задачи, изменение которых меняет сводку по смене
+ROLLUP_TASK_FIELDS = {
+    "project_id", "date_start", "shift", "active",
+    "material_consumption_kg", "people_fact", "worker_count",
+}
+# Работы сводки: активные задачи и задачи архива, активные на момент архивации
+ROLLUP_SOURCE_SQL = """
+    SELECT project_id, date_day, shift, material_consumption_kg, people_fact, worker_count
+      FROM project_task
+     WHERE active
+ UNION ALL
+    SELECT project_id, date_day, shift_id, material_consumption_kg, people_fact, worker_count
+      FROM custom_project_task_archive
+     WHERE was_active
+"""
+
+
+class ShiftRollup(models.Model):
+    _name = "custom_project.shift.rollup"
+    _description = "Сводка производства по сменам"
+    _order = "date desc, project_id, shift_id"
+
+    project_id = fields.Many2one("project.project", string="Цех/Участок", required=True, ondelete="cascade")
+    date = fields.Date(string="Дата", required=True, index=True)
+    shift_id = fields.Many2one("custom_project.shift", string="Смена", required=True, ondelete="cascade")
+
+    task_count = fields.Integer(string="Количество работ")
+    material_consumption_kg = fields.Float(string="Расход материала (кг)")
+    people_fact = fields.Integer(string="Исполнителей по факту")
+    worker_count = fields.Integer(string="Количество исполнителей")
+
+    _sql_constraints = [
+        ("key_uniq", "unique(project_id, date, shift_id)", "Сводка по смене уже существует!"),
+    ]
+
+    @api.model
+    def _refresh_keys(self, keys):
+        """
+        Пересчитывает сводки для ключей (id цеха, дата, id смены) одним запросом
+        по рабочим задачам и архиву задач: обновляет или создаёт строки,
+        строки без работ удаляет.
+        """
+        keys = [key for key in keys if all(key)]
+        if not keys:
+            return
+
+        self._flush_sources()
+        project_ids, dates, shift_ids = zip(*keys)
+        self.env.cr.execute(
+            f"""
+            WITH keys AS (
+                SELECT DISTINCT *
+                  FROM unnest(%s::int[], %s::date[], %s::int[]) AS k(project_id, date, shift_id)
+            ), totals AS (
+                SELECT k.project_id, k.date, k.shift_id,
+                       COUNT(t.date_day) AS task_count,
+                       COALESCE(SUM(t.material_consumption_kg), 0) AS material_consumption_kg,
+                       COALESCE(SUM(t.people_fact), 0) AS people_fact,
+                       COALESCE(SUM(t.worker_count), 0) AS worker_count
+                  FROM keys k
+             LEFT JOIN ({ROLLUP_SOURCE_SQL}) t
+                    ON t.project_id = k.project_id
+                   AND t.date_day = k.date
+                   AND t.shift = k.shift_id
+              GROUP BY k.project_id, k.date, k.shift_id
+            ), removed AS (
+                DELETE FROM custom_project_shift_rollup r
+                 USING totals
+                 WHERE totals.task_count = 0
+                   AND r.project_id = totals.project_id
+                   AND r.date = totals.date
+                   AND r.shift_id = totals.shift_id
+            )
+            INSERT INTO custom_project_shift_rollup
+                   (project_id, date, shift_id, task_count, material_consumption_kg,
+                    people_fact, worker_count, create_uid, create_date, write_uid, write_date)
+            SELECT project_id, date, shift_id, task_count, material_consumption_kg,
+                   people_fact, worker_count, %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC'
+              FROM totals
+             WHERE task_count > 0
+                ON CONFLICT (project_id, date, shift_id) DO UPDATE
+               SET task_count = EXCLUDED.task_count,
+                   material_consumption_kg = EXCLUDED.material_consumption_kg,
+                   people_fact = EXCLUDED.people_fact,
+                   worker_count = EXCLUDED.worker_count,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+            """,
+            [list(project_ids), list(dates), list(shift_ids), self.env.uid, self.env.uid],
+        )
+        self.invalidate_model()
+
+    @api.model
+    def rebuild(self, date_from=None, date_to=None):
+        """
+        Полная перестройка сводок за период (для первичного заполнения и сверки)
+        по рабочим задачам и архиву задач.
+        """
+        self._flush_sources()
+        rollup_conditions, task_conditions, params = ["TRUE"], ["TRUE"], []
+        if date_from:
+            rollup_conditions.append("date >= %s")
+            task_conditions.append("date_day >= %s")
+            params.append(date_from)
+        if date_to:
+            rollup_conditions.append("date <= %s")
+            task_conditions.append("date_day <= %s")
+            params.append(date_to)
+
+        self.env.cr.execute(
+            f"DELETE FROM custom_project_shift_rollup WHERE {' AND '.join(rollup_conditions)}",
+            params,
+        )
+        self.env.cr.execute(
+            f"""
+            INSERT INTO custom_project_shift_rollup
+                   (project_id, date, shift_id, task_count, material_consumption_kg,
+                    people_fact, worker_count, create_uid, create_date, write_uid, write_date)
+            SELECT project_id, date_day, shift, COUNT(*),
+                   COALESCE(SUM(material_consumption_kg), 0),
+                   COALESCE(SUM(people_fact), 0),
+                   COALESCE(SUM(worker_count), 0),
+                   %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC'
+              FROM ({ROLLUP_SOURCE_SQL}) t
+             WHERE project_id IS NOT NULL
+               AND date_day IS NOT NULL
+               AND shift IS NOT NULL
+               AND {' AND '.join(task_conditions)}
+          GROUP BY project_id, date_day, shift
+            """,
+            [self.env.uid, self.env.uid] + params,
+        )
+        self.invalidate_model()
+        return True
+
+    @api.model
+    def _flush_sources(self):
+        """Запись в базу полей задач и архива, из которых считаются сводки"""
+        self.env["project.task"].flush_model(
+            ["project_id", "date_day", "shift", "active",
+             "material_consumption_kg", "people_fact", "worker_count"]
+        )
+        self.env["custom_project.task.archive"].flush_model()
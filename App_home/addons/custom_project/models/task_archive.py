@@ -0,0 +1,293 @@
+import json
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from .project_task import BULK_MODE_CONTEXT
+
+_logger = logging.getLogger(__name__)
+
+# Горизонт хранения задач в рабочей таблице по умолчанию, дней
+DEFAULT_ARCHIVE_HORIZON_DAYS = 180
+# Размер порции задач при переносе в архив
+ARCHIVE_CHUNK_SIZE = 1000
+# Поля рабочих моделей, которые в архиве называются иначе
+ARCHIVE_FIELD_NAMES = {
+    "custom_project.task.archive": {"shift": "shift_id"},
+    "custom_project.quality.control.archive": {},
+}
+
+
+def _map_live_domain(archive_model, domain):
+    """
+    Переводит домен рабочей модели в домен архива. Возвращает None, если домен
+    ссылается на поле, которого в архиве нет: такой отбор к архиву не применим
+    """
+    field_names = ARCHIVE_FIELD_NAMES[archive_model._name]
+    archive_domain = []
+    for leaf in domain:
+        if isinstance(leaf, str):
+            archive_domain.append(leaf)
+            continue
+        field_path, operator, value = leaf
+        if not isinstance(field_path, str):
+            # Служебные листья TRUE_LEAF/FALSE_LEAF
+            archive_domain.append(leaf)
+            continue
+        field_name, *related_path = field_path.split(".")
+        field_name = field_names.get(field_name, field_name)
+        if field_name not in archive_model._fields or field_name in models.MAGIC_COLUMNS:
+            return None
+        archive_domain.append((".".join([field_name, *related_path]), operator, value))
+    return archive_domain
+
+
+class TaskArchive(models.Model):
+    _name = "custom_project.task.archive"
+    _description = "Архив производственных задач"
+    _order = "date_start desc, id desc"
+
+    original_id = fields.Integer(string="ID задачи", required=True, index=True, readonly=True)
+    name = fields.Char(string="Наименование работы", readonly=True)
+    project_id = fields.Many2one(
+        "project.project", string="Цех/Участок", ondelete="set null", index=True, readonly=True
+    )
+    schedule_id = fields.Many2one(
+        "task.schedule", string="Расписание", ondelete="set null", readonly=True
+    )
+    date_start = fields.Datetime(string="Дата начала", index=True, readonly=True)
+    # Конец смены задачи на момент архивации (для KPI план/факт)
+    planned_end = fields.Datetime(string="Плановое окончание", readonly=True)
+    date_day = fields.Date(string="День", index=True, readonly=True)
+    shift_id = fields.Many2one("custom_project.shift", string="Смена", ondelete="set null", readonly=True)
+    process_type = fields.Selection(
+        [
+            ("main", "Основной техпроцесс"),
+            ("parallel", "Вспомогательные работы"),
+        ],
+        string="Тип процесса",
+        readonly=True,
+    )
+    custom_task_type_id = fields.Many2one(
+        "project.task.type", string="Тип работы", ondelete="set null", readonly=True
+    )
+    stage_name = fields.Char(string="Стадия", readonly=True)
+    # Не active: иначе active_test скрывал бы архивированные задачи, которые были неактивны
+    was_active = fields.Boolean(string="Активна в момент архивации", readonly=True)
+    employee_ids = fields.Many2many(
+        "hr.employee", "custom_project_task_archive_employee_rel", "archive_id", "employee_id",
+        string="Исполнители", readonly=True,
+    )
+    worker_count = fields.Integer(string="Количество исполнителей", readonly=True)
+    people_fact = fields.Integer(string="Исполнителей по факту", readonly=True)
+    material_consumption_kg = fields.Float(string="Расход материала (кг)", readonly=True)
+    actual_start_time = fields.Datetime(string="Фактическое время начала", readonly=True)
+    actual_end_time = fields.Datetime(string="Фактическое время завершения", readonly=True)
+    quality_status = fields.Selection(
+        [
+            ("pending", "Ожидает контроля качества"),
+            ("accepted", "Принято ОТК"),
+            ("rejected", "Отклонено ОТК"),
+        ],
+        string="Статус контроля качества",
+        readonly=True,
+    )
+    quality_control_ids = fields.One2many(
+        "custom_project.quality.control.archive", "task_archive_id", string="Акты ОТК", readonly=True
+    )
+    archived_on = fields.Datetime(string="Перенесено в архив", readonly=True)
+
+    @api.model
+    def _from_task_domain(self, domain):
+        """Домен архива для домена project.task (только задачи, активные при архивации)"""
+        archive_domain = _map_live_domain(self, domain)
+        if archive_domain is None:
+            return None
+        return archive_domain + [("was_active", "=", True)]
+
+    @api.model
+    def _iter_export_rows(self, domain, page_size):
+        """
+        Строки выгрузки архивных задач в колонках EXPORT_HEADERS,
+        страницами по ключу (date_start, id)
+        """
+        shifts_by_id = self.env["custom_project.shift"]._get_shift_registry()["by_id"]
+        process_labels = dict(self._fields["process_type"]._description_selection(self.env))
+        status_labels = dict(self._fields["quality_status"]._description_selection(self.env))
+
+        after_domain = []
+        while True:
+            archives = self.search(domain + after_domain, order="date_start, id", limit=page_size)
+            if not archives:
+                break
+
+            # Пакетная подгрузка связей страницы
+            archives.mapped("employee_ids.name")
+            archives.mapped("quality_control_ids.original_id")
+            archives.mapped("project_id.name")
+            archives.mapped("custom_task_type_id.name")
+
+            for archive in archives:
+                shift = shifts_by_id.get(archive.shift_id.id)
+                controls = archive.quality_control_ids.sorted("original_id", reverse=True)
+                yield [
+                    archive.date_start,
+                    shift.name if shift else "",
+                    archive.project_id.name or "",
+                    archive.name,
+                    archive.custom_task_type_id.name or "",
+                    process_labels.get(archive.process_type, ""),
+                    archive.stage_name or "",
+                    ", ".join(archive.employee_ids.mapped("name")),
+                    archive.people_fact,
+                    archive.material_consumption_kg,
+                    status_labels.get(archive.quality_status, ""),
+                    controls[:1].name or "",
+                    archive.actual_start_time or "",
+                    archive.actual_end_time or "",
+                ]
+
+            last = archives[-1]
+            after_domain = [
+                "|", ("date_start", ">", last.date_start),
+                "&", ("date_start", "=", last.date_start), ("id", ">", last.id),
+            ]
+            self.env.invalidate_all()
+
+    @api.model
+    def _get_horizon_days(self):
+        return int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "custom_project.archive_horizon_days", DEFAULT_ARCHIVE_HORIZON_DAYS
+            )
+        )
+
+    @api.model
+    def _cron_archive_tasks(self):
+        """
+        CRON задача переноса задач старше горизонта (и их актов ОТК) в архив.
+        Порции фиксируются по отдельности; сводки по сменам не пересчитываются,
+        поэтому история производства в отчётах сохраняется.
+        """
+        horizon_days = self._get_horizon_days()
+        if horizon_days <= 0:
+            return
+        cutoff = fields.Datetime.now() - timedelta(days=horizon_days)
+        task_model = self.env["project.task"].with_context(active_test=False)
+
+        archived_count = 0
+        while True:
+            tasks = task_model.search(
+                [("date_start", "<", cutoff)], order="date_start, id", limit=ARCHIVE_CHUNK_SIZE
+            )
+            if not tasks:
+                break
+            self._archive_tasks(tasks)
+            archived_count += len(tasks)
+            if not self.env.registry.in_test_mode():
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+        _logger.info("Перенесено в архив задач старше %s: %s", cutoff, archived_count)
+
+    @api.model
+    def _archive_tasks(self, tasks):
+        """Копирует задачи и их акты ОТК в архив и удаляет их из рабочих таблиц"""
+        now = fields.Datetime.now()
+        booking_model = self.env["custom_project.employee.booking"]
+        controls = tasks.quality_control_ids
+        archives = self.create([
+            {
+                "original_id": task.id,
+                "name": task.name,
+                "project_id": task.project_id.id,
+                "schedule_id": task.schedule_id.id,
+                "date_start": task.date_start,
+                "planned_end": booking_model._get_task_interval(task)[1],
+                "date_day": task.date_day,
+                "shift_id": task.shift.id,
+                "process_type": task.process_type,
+                "custom_task_type_id": task.custom_task_type_id.id,
+                "stage_name": task.stage_id.name,
+                "was_active": task.active,
+                "employee_ids": [(6, 0, task.employee_ids.ids)],
+                "worker_count": task.worker_count,
+                "people_fact": task.people_fact,
+                "material_consumption_kg": task.material_consumption_kg,
+                "actual_start_time": task.actual_start_time,
+                "actual_end_time": task.actual_end_time,
+                "quality_status": task.quality_status,
+                "archived_on": now,
+            }
+            for task in tasks
+        ])
+        archive_by_task = dict(zip(tasks.ids, archives.ids))
+
+        self.env["custom_project.quality.control.archive"].create([
+            {
+                "original_id": control.id,
+                "task_archive_id": archive_by_task[control.task_id.id],
+                "name": control.name,
+                "inspector_id": control.inspector_id.id,
+                "inspection_datetime": control.inspection_datetime,
+                "status": control.status,
+                "product_batch": control.product_batch,
+                "certificate_number": control.certificate_number,
+                "parameters": control.parameters,
+                "notes": control.notes,
+                "measurement_data": control.measurement_data,
+                "measurements_json": json.dumps([
+                    {
+                        "parameter": measurement.parameter,
+                        "value": measurement.value,
+                        "unit": measurement.unit,
+                        "lower_limit": measurement.lower_limit if measurement.has_lower_limit else None,
+                        "upper_limit": measurement.upper_limit if measurement.has_upper_limit else None,
+                    }
+                    for measurement in control.measurement_ids
+                ], ensure_ascii=False),
+            }
+            for control in controls
+        ])
+
+        controls.unlink()
+        tasks.with_context(skip_shift_rollup=True, **BULK_MODE_CONTEXT).unlink()
+        return archives
+
+
+class QualityControlArchive(models.Model):
+    _name = "custom_project.quality.control.archive"
+    _description = "Архив актов контроля качества"
+    _order = "inspection_datetime desc, id desc"
+
+    original_id = fields.Integer(string="ID акта", required=True, index=True, readonly=True)
+    task_archive_id = fields.Many2one(
+        "custom_project.task.archive", string="Задача в архиве",
+        required=True, ondelete="cascade", index=True, readonly=True,
+    )
+    name = fields.Char(string="Номер акта", readonly=True)
+    inspector_id = fields.Many2one("hr.employee", string="Контролёр ОТК", ondelete="set null", readonly=True)
+    inspection_datetime = fields.Datetime(string="Время контроля", readonly=True)
+    status = fields.Selection(
+        [
+            ("pending", "Ожидает проверки"),
+            ("accepted", "Принято"),
+            ("rejected", "Забраковано"),
+        ],
+        string="Результат контроля",
+        readonly=True,
+    )
+    product_batch = fields.Char(string="Партия продукции", index=True, readonly=True)
+    certificate_number = fields.Char(string="Номер сертификата", readonly=True)
+    parameters = fields.Text(string="Контролируемые параметры", readonly=True)
+    notes = fields.Text(string="Замечания", readonly=True)
+    measurement_data = fields.Text(string="Данные измерений", readonly=True)
+    # Измерения акта: [{"parameter", "value", "unit", "lower_limit", "upper_limit"}],
+    # незаданная граница допуска — null
+    measurements_json = fields.Text(string="Измерения", readonly=True)
+
+    @api.model
+    def _from_control_domain(self, domain):
+        """Домен архива для домена quality.control"""
+        return _map_live_domain(self, domain)
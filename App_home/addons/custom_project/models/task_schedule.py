@@ -1,10 +1,33 @@
-from odoo import fields, models
+import uuid
+from collections import defaultdict
+from odoo import api, fields, models
 from datetime import timedelta
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
+from ..instrumentation import instrumented
+from .project_task import BULK_MODE_CONTEXT
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Размер порции задач при генерации плана
+GENERATION_CHUNK_SIZE = 1000
+# Максимальный горизонт планирования в днях
+MAX_PLANNING_DAYS = 366
+# Размер порции задач при удалении серии
+DELETION_CHUNK_SIZE = 500
+# Серии крупнее этого размера удаляются фоновым заданием
+BACKGROUND_DELETION_THRESHOLD = 5000
+# Планы крупнее этого размера генерируются фоновым заданием
+BACKGROUND_GENERATION_THRESHOLD = 3000
+# Через сколько минут без отметки воркера фоновая генерация считается прерванной
+GENERATION_CLAIM_TIMEOUT_MINUTES = 15
+# Поля задачи, синхронизируемые с планом при перепланировании
+REPLAN_SYNC_FIELDS = ["name", "date_start", "date_deadline", "shift_number", "maintenance_day"]
 
 
 class TaskSchedule(models.Model):
     _name = "task.schedule"
+    _inherit = ["mail.thread"]
     _description = "Расписание производственных задач"
 
     name = fields.Char(string="Название расписания", required=True)
@@ -21,12 +44,18 @@ class TaskSchedule(models.Model):
     )
 
     shift_count = fields.Selection(
-        [(str(i), str(i)) for i in range(1, 3)],
+        [(str(i), str(i)) for i in range(1, 4)],
         string="Количество смен для планирования",
         required=True,
         default="1",
     )
 
+    planning_days = fields.Integer(
+        string="Горизонт планирования (дней)",
+        default=0,
+        help="Количество суток плана по всем сменам. 0 — только указанное количество смен",
+    )
+
     equipment_maintenance_days = fields.Integer(
         string="Дней на ТО оборудования", default=0, required=True
     )
@@ -50,22 +79,165 @@ class TaskSchedule(models.Model):
         string="Дата начала планирования", required=True, default=fields.Datetime.now
     )
 
+    bulk_mode = fields.Boolean(
+        string="Массовый режим",
+        default=True,
+        help="Создавать задачи без истории изменений, подписчиков и уведомлений. "
+             "В расписание записывается одно сводное сообщение",
+    )
+
     # Связь с задачами
     project_task_ids = fields.One2many(
         "project.task", "schedule_id", string="Задачи расписания"
     )
 
-    def action_delete_schedule_series(self):
-        """Удалить всю серию расписаний и задач"""
+    deletion_requested = fields.Boolean(
+        string="Ожидает удаления", readonly=True, copy=False
+    )
+
+    # Состояние генерации задач
+    generation_state = fields.Selection(
+        [
+            ("draft", "Не запускалась"),
+            ("queued", "В очереди"),
+            ("running", "Выполняется"),
+            ("done", "Завершена"),
+            ("failed", "Ошибка"),
+        ],
+        string="Генерация задач",
+        default="draft",
+        required=True,
+        readonly=True,
+        copy=False,
+    )
+    generation_progress = fields.Integer(string="Создано задач", readonly=True, copy=False)
+    generation_total = fields.Integer(string="Всего задач в плане", readonly=True, copy=False)
+    generation_error = fields.Text(string="Ошибка генерации", readonly=True, copy=False)
+    # Начало последней полностью записанной смены плана: с неё продолжается генерация
+    generation_last_slot_start = fields.Datetime(
+        string="Сгенерировано по смену", readonly=True, copy=False
+    )
+    # Владелец фоновой генерации и время его последней отметки
+    generation_claim_token = fields.Char(readonly=True, copy=False)
+    generation_heartbeat = fields.Datetime(readonly=True, copy=False)
+
+    @api.constrains("planning_days")
+    def _check_planning_days(self):
         for schedule in self:
+            if not 0 <= schedule.planning_days <= MAX_PLANNING_DAYS:
+                raise ValidationError(
+                    f"Горизонт планирования должен быть от 0 до {MAX_PLANNING_DAYS} дней"
+                )
+
+    def action_delete_schedule_series(self):
+        """
+        Удалить всю серию расписаний и задач.
+        Небольшие серии удаляются сразу порциями, крупные ставятся в очередь
+        фонового задания, которое фиксирует прогресс после каждой порции.
+        """
+        task_counts = self._get_series_task_counts()
+        large_schedules = self.filtered(
+            lambda s: task_counts.get(s.id, 0) > BACKGROUND_DELETION_THRESHOLD
+        )
+        schedules_to_delete = self - large_schedules
+
+        removed_tasks = removed_controls = 0
+        for schedule in schedules_to_delete:
             # Удаляем все связанные задачи
-            self.project_task_ids.unlink()
-            # Удаляем само расписание
-            schedule.unlink()
+            tasks_count, controls_count = schedule._delete_series_tasks()
+            removed_tasks += tasks_count
+            removed_controls += controls_count
+        # Удаляем сами расписания
+        schedules_to_delete.unlink()
 
-        return self._show_success_notification(
-            f"Успешно удалено расписаний: {len(self)}."
+        message = (
+            f"Успешно удалено расписаний: {len(schedules_to_delete)}. "
+            f"Удалено задач: {removed_tasks}, актов ОТК: {removed_controls}."
         )
+        if large_schedules:
+            large_schedules.write({"deletion_requested": True})
+            self.env.ref("custom_project.ir_cron_delete_schedule_series")._trigger()
+            message += f" Поставлено в очередь на удаление расписаний: {len(large_schedules)}."
+
+        return self._show_success_notification(message)
+
+    def _get_series_task_counts(self):
+        """Количество задач по расписаниям одним запросом (включая архивные)"""
+        if not self.ids:
+            return {}
+        self.env["project.task"].flush_model(["schedule_id"])
+        self.env.cr.execute(
+            """
+            SELECT schedule_id, COUNT(*)
+              FROM project_task
+             WHERE schedule_id IN %s
+          GROUP BY schedule_id
+            """,
+            [tuple(self.ids)],
+        )
+        return dict(self.env.cr.fetchall())
+
+    def _delete_series_tasks(self, chunk_size=DELETION_CHUNK_SIZE, commit=False):
+        """
+        Удаляет задачи расписания и их акты ОТК порциями.
+        Задачи и акты порции выбираются одним запросом.
+        commit — фиксировать транзакцию после каждой порции (для фоновых заданий).
+        Возвращает (удалено задач, удалено актов ОТК).
+        """
+        self.ensure_one()
+        task_model = self.env["project.task"].with_context(
+            active_test=False, **BULK_MODE_CONTEXT
+        )
+        control_model = self.env["quality.control"]
+        removed_tasks = removed_controls = 0
+
+        while True:
+            task_model.flush_model(["schedule_id"])
+            control_model.flush_model(["task_id"])
+            self.env.cr.execute(
+                """
+                SELECT t.id, ARRAY_REMOVE(ARRAY_AGG(q.id), NULL)
+                  FROM project_task t
+             LEFT JOIN quality_control q ON q.task_id = t.id
+                 WHERE t.schedule_id = %s
+              GROUP BY t.id
+              ORDER BY t.id
+                 LIMIT %s
+                """,
+                [self.id, chunk_size],
+            )
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+
+            control_ids = [control_id for _task_id, ids in rows for control_id in ids]
+            control_model.browse(control_ids).unlink()
+            task_model.browse([task_id for task_id, _ids in rows]).unlink()
+            removed_tasks += len(rows)
+            removed_controls += len(control_ids)
+
+            if commit:
+                self._commit_progress()
+            self.env.invalidate_all()
+
+        return removed_tasks, removed_controls
+
+    def _commit_progress(self):
+        """Фиксация прогресса фонового задания (кроме тестового режима)"""
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    @api.model
+    def _cron_delete_requested_series(self):
+        """CRON задача удаления крупных серий, поставленных в очередь"""
+        for schedule in self.search([("deletion_requested", "=", True)]):
+            removed_tasks, removed_controls = schedule._delete_series_tasks(commit=True)
+            _logger.info(
+                "Удалена серия расписания %s: задач %s, актов ОТК %s",
+                schedule.id, removed_tasks, removed_controls,
+            )
+            schedule.unlink()
+            self._commit_progress()
 
     def _show_success_notification(self, message):
         """Вспомогательный метод для показа уведомлений"""
@@ -85,75 +257,473 @@ class TaskSchedule(models.Model):
     # В models/task_schedule.py
 
     def action_generate_tasks(self):
-        """Генерация задач из шаблонов расписания"""
+        """Генерация задач из шаблонов расписания порциями"""
         self.ensure_one()
 
         if not self.date_start:
             raise UserError("Укажите дату начала расписания!")
 
-        # Определяем типы процессов для выборки шаблонов
+        self.write({"generation_state": "running", "generation_error": False})
+        self._generate_tasks()
+        return True
+
+    def action_enqueue_generation(self):
+        """
+        Поставить генерацию задач в очередь фонового задания.
+        Метод возвращается сразу, ход выполнения доступен через get_generation_status.
+        Прогресс не сбрасывается: после ошибки генерация продолжается с места остановки.
+        """
+        for schedule in self:
+            if not schedule.date_start:
+                raise UserError("Укажите дату начала расписания!")
+            if schedule.generation_state in ("queued", "running"):
+                continue
+            schedule.write({
+                "generation_state": "queued",
+                "generation_total": schedule._count_planned_tasks(),
+                "generation_error": False,
+            })
+        self.env.ref("custom_project.ir_cron_generate_schedule_tasks")._trigger()
+        return True
+
+    def get_generation_status(self):
+        """Состояние генерации для опроса из интерфейса"""
+        return [
+            {
+                "id": schedule.id,
+                "state": schedule.generation_state,
+                "progress": schedule.generation_progress,
+                "total": schedule.generation_total,
+                "percent": (
+                    round(100.0 * schedule.generation_progress / schedule.generation_total)
+                    if schedule.generation_total else 0
+                ),
+                "error": schedule.generation_error or False,
+            }
+            for schedule in self
+        ]
+
+    def _count_planned_tasks(self):
+        """Количество задач плана без записи в базу"""
+        self.ensure_one()
+        return sum(1 for _task_vals in self._iter_task_vals())
+
+    @instrumented(rows=lambda schedule, result: schedule.generation_progress)
+    def _generate_tasks(self, commit=False, claim_token=None):
+        """
+        Создаёт задачи плана порциями по целым сменам, записывая после каждой порции
+        прогресс и начало последней записанной смены (generation_last_slot_start).
+        Смены плана идут по возрастанию начала, поэтому прерванная генерация
+        продолжается со следующей смены независимо от размера порций.
+        commit — фиксировать транзакцию после каждой порции (для фоновых заданий).
+        claim_token — токен воркера: порция фиксируется, только пока расписание за ним.
+        Возвращает False, если расписание забрал другой воркер.
+        """
+        self.ensure_one()
+        bulk_mode = self.bulk_mode
+        task_model = self.env["project.task"]
+        if bulk_mode:
+            task_model = task_model.with_context(**BULK_MODE_CONTEXT)
+
+        self._ensure_shift_instances()
+        created_count = self.generation_progress
+        task_vals_iter = self._iter_task_vals()
+        resume_after = self.generation_last_slot_start
+        if resume_after:
+            task_vals_iter = (
+                task_vals for task_vals in task_vals_iter if task_vals["date_start"] > resume_after
+            )
+        for task_vals_list in self._iter_task_vals_chunks(task_vals_iter=task_vals_iter):
+            task_model.create(task_vals_list)
+            created_count += len(task_vals_list)
+            self.write({
+                "generation_progress": created_count,
+                "generation_last_slot_start": task_vals_list[-1]["date_start"],
+            })
+            # Не держим созданные порции в кэше, чтобы память не росла с горизонтом
+            self.env.flush_all()
+            if claim_token and not self._renew_generation_claim(claim_token):
+                self.env.cr.rollback()
+                self.env.invalidate_all()
+                _logger.warning("Генерацию расписания %s продолжает другой воркер", self.id)
+                return False
+            if commit:
+                self._commit_progress()
+            self.env.invalidate_all()
+
+        self.write({
+            "generation_state": "done",
+            "generation_progress": created_count,
+            "generation_total": created_count,
+            "generation_claim_token": False,
+        })
+        if bulk_mode:
+            self.message_post(body=f"Сгенерировано задач: {created_count}")
+        return True
+
+    @api.model
+    def _cron_generate_queued_schedules(self):
+        """
+        CRON задача фоновой генерации. Расписание забирается атомарно
+        (_claim_queued_schedule) с записью токена воркера, поэтому после фиксации
+        его не возьмёт другой воркер. «Выполняется» подхватывается повторно,
+        только если владелец давно не отмечался (запуск прерван, например, по лимиту времени).
+        """
+        claim_token = uuid.uuid4().hex
+        while True:
+            schedule = self._claim_queued_schedule(claim_token)
+            if not schedule:
+                break
+
+            self._commit_progress()
+            try:
+                schedule._generate_tasks(commit=True, claim_token=claim_token)
+                self._commit_progress()
+            except Exception as e:
+                self.env.cr.rollback()
+                self.env.invalidate_all()
+                _logger.exception("Ошибка фоновой генерации расписания %s", schedule.id)
+                schedule.filtered(lambda s: s.generation_claim_token == claim_token).write({
+                    "generation_state": "failed",
+                    "generation_error": str(e),
+                    "generation_claim_token": False,
+                })
+                self._commit_progress()
+            _logger.info(
+                "Генерация расписания %s: %s, задач %s",
+                schedule.id, schedule.generation_state, schedule.generation_progress,
+            )
+
+    @api.model
+    def _claim_queued_schedule(self, claim_token):
+        """
+        Забирает одно расписание из очереди одним UPDATE ... RETURNING:
+        в очереди или выполняющееся без отметки владельца дольше таймаута.
+        SKIP LOCKED разводит воркеров внутри транзакции, токен — после её фиксации.
+        """
+        self.flush_model(["generation_state", "generation_claim_token", "generation_heartbeat"])
+        self.env.cr.execute(
+            """
+            UPDATE task_schedule
+               SET generation_state = 'running',
+                   generation_claim_token = %s,
+                   generation_heartbeat = NOW() AT TIME ZONE 'UTC'
+             WHERE id = (
+                    SELECT id
+                      FROM task_schedule
+                     WHERE generation_state = 'queued'
+                        OR (generation_state = 'running'
+                            AND (generation_heartbeat IS NULL
+                                 OR generation_heartbeat < NOW() AT TIME ZONE 'UTC' - %s * INTERVAL '1 minute'))
+                  ORDER BY id
+                     LIMIT 1
+                       FOR UPDATE SKIP LOCKED
+                   )
+         RETURNING id
+            """,
+            [claim_token, GENERATION_CLAIM_TIMEOUT_MINUTES],
+        )
+        row = self.env.cr.fetchone()
+        self.invalidate_model(["generation_state", "generation_claim_token", "generation_heartbeat"])
+        return self.browse(row[0]) if row else self.browse()
+
+    def _renew_generation_claim(self, claim_token):
+        """Отметка владельца генерации; False — расписание уже забрал другой воркер"""
+        self.ensure_one()
+        self.env.cr.execute(
+            """
+            UPDATE task_schedule
+               SET generation_heartbeat = NOW() AT TIME ZONE 'UTC'
+             WHERE id = %s
+               AND generation_claim_token = %s
+         RETURNING id
+            """,
+            [self.id, claim_token],
+        )
+        claimed = bool(self.env.cr.fetchone())
+        self.invalidate_recordset(["generation_heartbeat"])
+        return claimed
+
+    def action_replan_tasks(self):
+        """
+        Перепланирование по текущим шаблонам без пересоздания серии.
+        Целевой план сравнивается с задачами расписания по ключу
+        (день, смена, тип процесса, тип работы): создаются недостающие задачи,
+        обновляются отличающиеся и архивируются лишние. Меняются только задачи
+        в стадии «Запланировано», фактические данные, исполнители и акты ОТК сохраняются.
+        Смена (день, смена, тип процесса), занятая начатой или завершённой задачей,
+        остаётся за ней, даже если шаблон теперь задаёт другой тип работы.
+        """
+        self.ensure_one()
+
+        planned_stage_id = self.env.ref("custom_project.project_task_stage_planned").id
+        task_model = self.env["project.task"].with_context(active_test=False)
+        if self.bulk_mode:
+            task_model = task_model.with_context(**BULK_MODE_CONTEXT)
+
+        sync_fields = [task_model._fields[name] for name in REPLAN_SYNC_FIELDS]
+        existing_by_key = {}
+        # Смены (день, смена, тип процесса) с начатыми задачами: уникальность смены
+        # не учитывает тип работы, поэтому новую задачу туда не поставить
+        occupied_slots = set()
+        to_archive_ids = []
+        for row in self._read_replan_rows():
+            key = (row["date_start"].date(), row["shift"], row["process_type"], row["custom_task_type_id"])
+            if row["stage_id"] != planned_stage_id:
+                # Начатые и завершённые задачи не трогаем, смена считается занятой
+                if row["active"]:
+                    occupied_slots.add(key[:3])
+                previous_row = existing_by_key.get(key)
+                if previous_row and previous_row["active"]:
+                    to_archive_ids.append(previous_row["id"])
+                existing_by_key[key] = None
+            elif key in existing_by_key:
+                # Дубли ключа архивируем
+                if row["active"]:
+                    to_archive_ids.append(row["id"])
+            else:
+                existing_by_key[key] = row
+
+        to_create = []
+        task_ids_by_changes = defaultdict(list)
+        matched_keys = set()
+        for task_vals in self._iter_task_vals():
+            key = (
+                task_vals["date_start"].date(),
+                task_vals["shift"],
+                task_vals["process_type"],
+                task_vals["custom_task_type_id"],
+            )
+            matched_keys.add(key)
+            if key not in existing_by_key:
+                if key[:3] not in occupied_slots:
+                    to_create.append(task_vals)
+                continue
+
+            row = existing_by_key[key]
+            if row is None:
+                continue
+            changes = {
+                field.name: task_vals.get(field.name, False)
+                for field in sync_fields
+                if field.convert_to_cache(task_vals.get(field.name, False), task_model)
+                != field.convert_to_cache(row[field.name], task_model)
+            }
+            if not row["active"]:
+                changes["active"] = True
+            if changes:
+                task_ids_by_changes[tuple(sorted(changes.items()))].append(row["id"])
+
+        to_archive_ids.extend(
+            row["id"]
+            for key, row in existing_by_key.items()
+            if row and key not in matched_keys and row["active"]
+        )
+
+        # Сначала архивируем, чтобы освободить смены для новых задач
+        if to_archive_ids:
+            task_model.browse(to_archive_ids).write({"active": False})
+        for changes, task_ids in task_ids_by_changes.items():
+            task_model.browse(task_ids).write(dict(changes))
+        for start in range(0, len(to_create), GENERATION_CHUNK_SIZE):
+            task_model.create(to_create[start:start + GENERATION_CHUNK_SIZE])
+
+        updated_count = sum(len(task_ids) for task_ids in task_ids_by_changes.values())
+        message = (
+            f"Перепланирование: создано задач {len(to_create)}, "
+            f"обновлено {updated_count}, архивировано {len(to_archive_ids)}"
+        )
+        self.message_post(body=message)
+        return self._show_success_notification(message)
+
+    def _plan_dry_run(self):
+        """
+        Расчёт плана в памяти без записи в базу (подходит и для записи из new()):
+        количество работ, дата последней смены и конфликты уникальности —
+        повторы смены внутри плана и совпадения с существующими работами.
+        """
+        self.ensure_one()
+        slot_counts = defaultdict(int)
+        task_count = 0
+        last_start = False
+        for task_vals in self._iter_task_vals():
+            task_count += 1
+            last_start = max(last_start or task_vals["date_start"], task_vals["date_start"])
+            slot = (task_vals["date_start"].date(), task_vals["process_type"], task_vals["shift"])
+            slot_counts[slot] += 1
+
+        conflicts = [
+            {"date": slot[0], "process_type": slot[1], "shift_id": slot[2], "existing": False}
+            for slot, count in slot_counts.items()
+            if count > 1
+        ]
+        conflicts += [
+            {"date": slot[0], "process_type": slot[1], "shift_id": slot[2], "existing": True}
+            for slot in self._find_existing_slots(list(slot_counts))
+        ]
+        return {
+            "task_count": task_count,
+            "date_end": last_start and last_start.date(),
+            "conflicts": sorted(conflicts, key=lambda c: (c["date"], c["shift_id"], c["process_type"])),
+        }
+
+    def _find_existing_slots(self, slots):
+        """Смены плана (день, тип процесса, id смены), уже занятые работами цеха"""
+        if not slots or not self.project_id:
+            return []
+
+        self.env["project.task"].flush_model(["project_id", "date_day", "process_type", "shift", "active"])
+        dates, process_types, shift_ids = zip(*slots)
+        self.env.cr.execute(
+            """
+            SELECT DISTINCT t.date_day, t.process_type, t.shift
+              FROM unnest(%s::date[], %s::varchar[], %s::int[]) AS s(date_day, process_type, shift)
+              JOIN project_task t
+                ON t.project_id = %s
+               AND t.date_day = s.date_day
+               AND t.process_type = s.process_type
+               AND t.shift = s.shift
+               AND t.active
+            """,
+            [list(dates), list(process_types), list(shift_ids), self.project_id.id],
+        )
+        return self.env.cr.fetchall()
+
+    def _read_replan_rows(self):
+        """Строки задач расписания (включая архивные) для сравнения с планом"""
+        columns = ["id", "date_start", "shift", "process_type", "custom_task_type_id",
+                   "stage_id", "active"] + REPLAN_SYNC_FIELDS
+        self.env["project.task"].flush_model(columns[1:])
+        self.env.cr.execute(
+            f"""
+            SELECT {", ".join(columns)}
+              FROM project_task
+             WHERE schedule_id = %s
+          ORDER BY id
+            """,
+            [self.id],
+        )
+        return self.env.cr.dictfetchall()
+
+    def _ensure_shift_instances(self):
+        """Календарь смен на весь период плана, чтобы задачи сразу привязались к сменам"""
+        shifts_per_day = len(self.env["custom_project.shift"]._get_shift_registry()["cycle"]) or 1
+        first_day = fields.Datetime.to_datetime(self.date_start).date()
+        plan_days = self._get_slot_count(shifts_per_day) // shifts_per_day + 1
+        self.env["custom_project.shift.instance"]._ensure_instances(
+            first_day - timedelta(days=1), first_day + timedelta(days=plan_days + 1)
+        )
+
+    def _get_process_types(self):
+        """Типы процессов для выборки шаблонов"""
         if self.process_type == "both":
-            process_types = ["main", "parallel"]
-        else:
-            process_types = [self.process_type]
+            return ["main", "parallel"]
+        return [self.process_type]
 
-        templates = self.env["task.schedule.template"].search([
-            ("process_type", "in", process_types),
-            ("active", "=", True),
-        ]).sorted("sequence")
+    def _get_template_index(self, process_types):
+        """
+        Индекс шаблонов (тип процесса, смена, день плана) -> ((id типа работы, название), ...)
+        из кэша шаблонов и длина цикла шаблонов в днях.
+        """
+        index = {
+            key: task_types
+            for key, task_types in self.env["task.schedule.template"]._get_template_registry().items()
+            if key[0] in process_types
+        }
 
-        if not templates:
+        if not index:
             raise UserError("Не найдено активных шаблонов для указанных типов процессов!")
 
-        task_vals_list = []
-        current_datetime = fields.Datetime.to_datetime(self.date_start)
+        return index, max(day_number for _process_type, _shift_id, day_number in index)
 
-        # Получаем все смены
-        shifts = self.env["custom_project.shift"].search([], order="start_hour")
-        shift_cycle = shifts  # [morning, day, night]
+    def _get_slot_count(self, shifts_per_day):
+        """Количество смен в плане: по горизонту в днях или по количеству смен"""
+        if self.planning_days:
+            return self.planning_days * shifts_per_day
+        return int(self.shift_count)
 
-        total_shifts = int(self.shift_count)
-        start_index = int(self.start_shift) - 1  # 0-based
+    def _iter_shift_slots(self, shifts):
+        """
+        Последовательные смены плана начиная со стартовой.
+        shifts — [(id смены, час начала)] в порядке цикла.
+        Возвращает (номер смены в цикле, день плана от 0, id смены, начало смены).
+        """
+        instance_model = self.env["custom_project.shift.instance"]
+        plant_tz = instance_model._get_plant_tz()
+        first_day = fields.Datetime.to_datetime(self.date_start).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        start_index = int(self.start_shift) - 1
+        day_offset = 0
+        previous_hour = None
 
-        for i in range(total_shifts):
-            # Определяем текущую смену по циклу
-            shift_index = (start_index + i) % len(shift_cycle)
-            shift = shift_cycle[shift_index]
+        for i in range(self._get_slot_count(len(shifts))):
+            shift_index = (start_index + i) % len(shifts)
+            shift_id, start_hour = shifts[shift_index]
+            # Смена начинается не позже предыдущей — значит, перешли на следующие сутки
+            if previous_hour is not None and start_hour <= previous_hour:
+                day_offset += 1
+            previous_hour = start_hour
+            # Часы смен заданы по местному времени завода
+            task_start = instance_model._local_to_utc(
+                first_day + timedelta(days=day_offset, hours=start_hour), plant_tz
+            )
+            yield shift_index + 1, day_offset, shift_id, task_start
 
-            # Корректируем дату: каждая смена — +8 часов
-            if i == 0:
-                # Первая смена начинается в start_hour текущей даты
-                task_start = current_datetime.replace(
-                    hour=shift.start_hour, minute=0, second=0, microsecond=0
-                )
-            else:
-                task_start = current_datetime + timedelta(hours=8 * i) if current_datetime else timedelta(hours=8 * i)
-
-            # Для ночной смены, начинающейся в 22:00, следующий день начинается утром
-            # Но для простоты оставим линейное приращение
-
-            for template in templates.filtered(lambda t: t.process_type in process_types and t.shift.id == shift.id):
-                task_vals = {
-                    "name": template.task_type_id.name,
-                    "project_id": self.project_id.id,
-                    "schedule_id": self.id,
-                    "process_type": template.process_type,
-                    "shift": shift.id,
-                    "date_start": task_start,
-                    "date_deadline": task_start + timedelta(hours=1),
-                    "custom_task_type_id": template.task_type_id.id,
-                    "planning_series_datetime": fields.Datetime.now(),
-                    "shift_number": str(i + int(self.start_shift)),
-                    "stage_id": self.env.ref("custom_project.project_task_stage_planned").id,
-                }
-
-                # Если указаны дни ТО
-                if self.equipment_maintenance_days > 0:
-                    task_vals["maintenance_day"] = i + 1  # или другая логика
-
-                task_vals_list.append(task_vals)
-
-        if task_vals_list:
-            self.env["project.task"].create(task_vals_list)
-
-        return True
\ No newline at end of file
+    def _iter_task_vals(self):
+        """Генератор значений задач плана по шаблонам с учётом дня плана"""
+        process_types = self._get_process_types()
+        template_index, cycle_days = self._get_template_index(process_types)
+        shifts = [
+            (shift.id, shift.start_hour)
+            for shift in self.env["custom_project.shift"]._get_shift_registry()["cycle"]
+        ]
+        if not shifts:
+            raise UserError("Не найдено производственных смен!")
+
+        planned_stage_id = self.env.ref("custom_project.project_task_stage_planned").id
+        series_datetime = fields.Datetime.now()
+        project_id = self.project_id.id
+        with_maintenance = self.equipment_maintenance_days > 0
+
+        for shift_number, day_offset, shift_id, task_start in self._iter_shift_slots(shifts):
+            day_number = day_offset % cycle_days + 1
+            for process_type in process_types:
+                for task_type_id, task_type_name in template_index.get(
+                    (process_type, shift_id, day_number), ()
+                ):
+                    task_vals = {
+                        "name": task_type_name,
+                        "project_id": project_id,
+                        "schedule_id": self.id,
+                        "process_type": process_type,
+                        "shift": shift_id,
+                        "date_start": task_start,
+                        "date_deadline": task_start + timedelta(hours=1),
+                        "custom_task_type_id": task_type_id,
+                        "planning_series_datetime": series_datetime,
+                        "shift_number": str(shift_number),
+                        "stage_id": planned_stage_id,
+                    }
+
+                    # Если указаны дни ТО
+                    if with_maintenance:
+                        task_vals["maintenance_day"] = day_offset + 1
+
+                    yield task_vals
+
+    def _iter_task_vals_chunks(self, chunk_size=GENERATION_CHUNK_SIZE, task_vals_iter=None):
+        """
+        Значения задач плана (или переданного итератора) порциями не меньше chunk_size.
+        Порция заканчивается на границе смены, чтобы смена не делилась между порциями.
+        """
+        if task_vals_iter is None:
+            task_vals_iter = self._iter_task_vals()
+        chunk = []
+        for task_vals in task_vals_iter:
+            if len(chunk) >= chunk_size and task_vals["date_start"] != chunk[-1]["date_start"]:
+                yield chunk
+                chunk = []
+            chunk.append(task_vals)
+        if chunk:
+            yield chunk
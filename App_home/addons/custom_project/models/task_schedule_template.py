@@ -1,4 +1,6 @@
-from odoo import fields, models, api
+from collections import defaultdict
+
+from odoo import fields, models, api, tools
 from odoo.exceptions import ValidationError
 
 
@@ -52,4 +54,34 @@ class TaskScheduleTemplate(models.Model):
     def _check_positive_values(self):
         for record in self:
             if record.day_number <= 0:
-                raise ValidationError("Номер дня должен быть положительным числом")
\ No newline at end of file
+                raise ValidationError("Номер дня должен быть положительным числом")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        templates = super().create(vals_list)
+        self.clear_caches()
+        return templates
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
+    @api.model
+    @tools.ormcache("self.env.lang")
+    def _get_template_registry(self):
+        """
+        Кэш активных шаблонов, сбрасывается при create/write/unlink шаблонов:
+        {(тип процесса, id смены, день плана): ((id типа работы, название), ...)}
+        в порядке sequence. Значения общие для всех вызовов, изменять их нельзя.
+        """
+        index = defaultdict(list)
+        for template in self.sudo().search([("active", "=", True)]):
+            key = (template.process_type, template.shift.id, template.day_number)
+            index[key].append((template.task_type_id.id, template.task_type_id.name))
+        return {key: tuple(task_types) for key, task_types in index.items()}
@@ -0,0 +1,3 @@
+from . import quality_spc_report
+from . import shift_kpi_report
+from . import employee_booking_report
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+
+class EmployeeBookingReport(models.AbstractModel):
+    _name = "report.custom_project.report_employee_booking"
+    _description = "Отчёт о конфликтах занятости исполнителей"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        data = data or {}
+        date_from = fields.Datetime.to_datetime(data.get("date_from")) or fields.Datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        date_to = fields.Datetime.to_datetime(data.get("date_to")) or date_from + timedelta(days=7)
+        employees = self.env["hr.employee"].browse(docids)
+
+        booking_model = self.env["custom_project.employee.booking"]
+        conflicts = booking_model.find_conflicts(date_from, date_to, employees.ids)
+        tasks = self.env["project.task"].browse(
+            {c["task_id"] for c in conflicts} | {c["other_task_id"] for c in conflicts}
+        )
+
+        return {
+            "doc_ids": docids,
+            "doc_model": "hr.employee",
+            "docs": employees,
+            "date_from": date_from,
+            "date_to": date_to,
+            "min_rest_hours": booking_model._get_min_rest_hours(),
+            "conflicts": conflicts,
+            "employee_names": dict(employees.name_get()),
+            "task_names": dict(tasks.name_get()),
+        }
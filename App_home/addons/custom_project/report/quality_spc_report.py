@@ -0,0 +1,16 @@
+from odoo import api, models
+
+
+class QualitySpcReport(models.AbstractModel):
+    _name = "report.custom_project.report_quality_spc"
+    _description = "Отчёт SPC по измерениям ОТК"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        controls = self.env["quality.control"].browse(docids)
+        return {
+            "doc_ids": docids,
+            "doc_model": "quality.control",
+            "docs": controls,
+            "statistics": controls._compute_spc_statistics(),
+        }
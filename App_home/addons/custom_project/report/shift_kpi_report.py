@@ -0,0 +1,31 @@
+from odoo import api, fields, models
+
+
+class ShiftKpiReport(models.AbstractModel):
+    _name = "report.custom_project.report_shift_kpi"
+    _description = "Отчёт план/факт по сменам"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        data = data or {}
+        kpi_model = self.env["custom_project.shift.kpi"]
+        default_from, default_to = kpi_model._get_default_period()
+        date_from = fields.Datetime.to_datetime(data.get("date_from")) or default_from
+        date_to = fields.Datetime.to_datetime(data.get("date_to")) or default_to
+        projects = self.env["project.project"].browse(docids)
+
+        return {
+            "doc_ids": docids,
+            "doc_model": "project.project",
+            "docs": projects,
+            "date_from": date_from,
+            "date_to": date_to,
+            "sections": [
+                (title, kpi_model.get_kpis(date_from, date_to, group_by, projects.ids))
+                for group_by, title in (
+                    ("shift", "По сменам"),
+                    ("task_type", "По типам работ"),
+                    ("project", "По цехам"),
+                )
+            ],
+        }
@@ -0,0 +1,32 @@
+/** @odoo-module **/
+import { CalendarModel } from "@web/views/calendar/calendar_model";
+
+/**
+ * Модель календаря задач, читающая данные из /custom_project/calendar:
+ * только хранимые поля, сгруппированные на сервере по дню и смене.
+ * Браузер повторно запрашивает диапазон с If-None-Match, и неизменённые
+ * данные приходят ответом 304 из HTTP-кэша.
+ */
+export class CustomProjectCalendarModel extends CalendarModel {
+    async fetchRecords(data) {
+        const params = new URLSearchParams({
+            domain: JSON.stringify(this.computeDomain(data)),
+        });
+        const response = await fetch(`/custom_project/calendar?${params}`, {
+            credentials: "same-origin",
+            headers: { Accept: "application/json" },
+        });
+        if (!response.ok) {
+            throw new Error(`Календарь: ошибка загрузки (${response.status})`);
+        }
+        const payload = await response.json();
+
+        const records = [];
+        for (const shiftBuckets of Object.values(payload.days)) {
+            for (const bucket of Object.values(shiftBuckets)) {
+                records.push(...bucket);
+            }
+        }
+        return records;
+    }
+}
@@ -3,6 +3,7 @@ import { CalendarController } from "@web/views/calendar/calendar_controller";
 import { useService } from "@web/core/utils/hooks";
 import { onMounted, onPatched, onWillUnmount } from "@odoo/owl";
 import { registry } from "@web/core/registry";
+import { CustomProjectCalendarModel } from "./calendar_model";
 
 const CUSTOM_CALENDAR_JS_CLASS = "custom_project_calendar_create_series";
 
@@ -186,6 +187,7 @@ import { calendarView } from "@web/views/calendar/calendar_view";
 const customProjectCalendarView = {
     ...calendarView,
     Controller: CustomProjectCalendarController,
+    Model: CustomProjectCalendarModel,
 };
 
 registry.category("views").add(CUSTOM_CALENDAR_JS_CLASS, customProjectCalendarView);
@@ -3,6 +3,7 @@ import { CalendarController } from "@web/views/calendar/calendar_controller";
 import { useService } from "@web/core/utils/hooks";
 import { onMounted, onPatched, onWillUnmount } from "@odoo/owl";
 import { registry } from "@web/core/registry";
+import { CustomProjectCalendarModel } from "./calendar_model";
 
 const CUSTOM_CALENDAR_S_JS_CLASS = "custom_project_calendar_create_tasks";
 
@@ -76,16 +77,17 @@ export class CustomProjectCalendarController_S extends CalendarController {
             }
         }
 
-        // Если задача открыта из контекста (редко для календаря)
-        const { resModel, resId } = this.props;
-        if (!projectId && resModel === 'project.task' && resId) {
-            const taskData = await this.orm.call('project.task', 'read', [resId], ['project_id']);
-            if (taskData?.[0]?.project_id) {
-                projectId = taskData[0].project_id[0];
-                console.log(`[custom_project_calendar_my] Project ID из задачи: ${projectId}`);
+        // Цех из уже загруженных записей календаря, без отдельного чтения задачи
+        if (!projectId) {
+            const projectIds = new Set(
+                Object.values(this.model.records).map(record => record.rawRecord.project_id?.[0]).filter(Boolean)
+            );
+            if (projectIds.size === 1) {
+                projectId = [...projectIds][0];
+                console.log(`[custom_project_calendar_my] Project ID из записей календаря: ${projectId}`);
             }
         }
-        
+
         const self = this;
         // === 2. Вызов существующего действия через его XML ID ===
         await this.actionService.doAction('custom_project.action_open_custom_task_form2', {
@@ -244,6 +246,7 @@ import { calendarView } from "@web/views/calendar/calendar_view";
 const customProjectCalendar_SView = {
     ...calendarView,
     Controller: CustomProjectCalendarController_S,
+    Model: CustomProjectCalendarModel,
 };
 
 registry.category("views").add(CUSTOM_CALENDAR_S_JS_CLASS, customProjectCalendar_SView);
@@ -0,0 +1,5 @@
+from . import test_employee_booking
+from . import test_planning_benchmarks
+from . import test_shift_rollup
+from . import test_task_archive
+from . import test_task_replan
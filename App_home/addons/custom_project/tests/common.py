@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from odoo.tests import TransactionCase
+
+
+class CustomProjectCase(TransactionCase):
+    """
+    Общие данные тестов модуля: смены, стадии и собственные шаблоны расписания.
+    Поставляемые шаблоны архивируются, чтобы план зависел только от шаблонов теста
+    (по одному на тип процесса, смену и день плана).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.shift_morning = cls.env.ref("custom_project.shift_morning")
+        cls.shift_day = cls.env.ref("custom_project.shift_day")
+        cls.shift_night = cls.env.ref("custom_project.shift_night")
+        cls.stage_planned = cls.env.ref("custom_project.project_task_stage_planned")
+        cls.stage_in_progress = cls.env.ref("custom_project.project_task_stage_in_progress")
+        cls.stage_completed = cls.env.ref("custom_project.project_task_stage_completed")
+        # Понедельник далеко в будущем: план не пересекается с данными базы
+        cls.plan_start = datetime(2031, 1, 6)
+
+        cls.env["task.schedule.template"].search([]).write({"active": False})
+        cls.task_type_main, cls.task_type_parallel = cls.env["project.task.type"].create([
+            {"name": "Тестовая плавка", "process_type": "main"},
+            {"name": "Тестовая подготовка", "process_type": "parallel"},
+        ])
+        cls.project = cls.env["project.project"].create({"name": "Тестовый цех"})
+
+    @classmethod
+    def _create_templates(cls, slots):
+        """Шаблоны по слотам [(тип процесса, смена, день плана)], по одному на слот"""
+        task_types = {"main": cls.task_type_main, "parallel": cls.task_type_parallel}
+        return cls.env["task.schedule.template"].create([
+            {
+                "process_type": process_type,
+                "shift": shift.id,
+                "day_number": day_number,
+                "task_type_id": task_types[process_type].id,
+            }
+            for process_type, shift, day_number in slots
+        ])
+
+    @classmethod
+    def _create_schedule(cls, project=None, **vals):
+        return cls.env["task.schedule"].create(dict({
+            "name": "Тестовое расписание",
+            "project_id": (project or cls.project).id,
+            "process_type": "main",
+            "start_shift": "1",
+            "shift_count": "3",
+            "date_start": cls.plan_start,
+        }, **vals))
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import CustomProjectCase
+
+
+@tagged("post_install", "-at_install")
+class TestEmployeeBooking(CustomProjectCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.employee = cls.env["hr.employee"].create({"name": "Тестовый сталевар"})
+        cls.booking_model = cls.env["custom_project.employee.booking"]
+
+    def _create_task(self, process_type, shift, day=0, employees=None):
+        return self.env["project.task"].create({
+            "name": "Работа",
+            "project_id": self.project.id,
+            "process_type": process_type,
+            "shift": shift.id,
+            "date_start": self.plan_start + timedelta(days=day, hours=shift.start_hour),
+            "stage_id": self.stage_planned.id,
+            "employee_ids": [(6, 0, (self.employee if employees is None else employees).ids)],
+        })
+
+    def _find_conflicts(self, min_rest_hours):
+        return self.booking_model.find_conflicts(
+            self.plan_start, self.plan_start + timedelta(days=3), self.employee.ids, min_rest_hours
+        )
+
+    def _set_check_mode(self, mode):
+        self.env["ir.config_parameter"].sudo().set_param("custom_project.employee_booking_check", mode)
+
+    def test_find_overlap(self):
+        task = self._create_task("main", self.shift_morning)
+        other_task = self._create_task("parallel", self.shift_morning)
+        self._create_task("main", self.shift_night)
+
+        conflicts = self._find_conflicts(min_rest_hours=0)
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0]["kind"], "overlap")
+        self.assertEqual(conflicts[0]["employee_id"], self.employee.id)
+        self.assertEqual({conflicts[0]["task_id"], conflicts[0]["other_task_id"]}, {task.id, other_task.id})
+
+    def test_find_short_rest(self):
+        morning_task = self._create_task("main", self.shift_morning)
+        day_task = self._create_task("main", self.shift_day)
+
+        conflicts = self._find_conflicts(min_rest_hours=8)
+        self.assertEqual(
+            [(c["kind"], c["other_task_id"], c["task_id"], c["gap_hours"]) for c in conflicts],
+            [("rest", morning_task.id, day_task.id, 0.0)],
+        )
+        # Смены подряд без пересечения — не двойное назначение
+        self.assertFalse(self._find_conflicts(min_rest_hours=0))
+
+    def test_archived_task_is_ignored(self):
+        self._create_task("main", self.shift_morning)
+        other_task = self._create_task("parallel", self.shift_morning)
+        other_task.active = False
+        self.assertFalse(self._find_conflicts(min_rest_hours=8))
+
+    def test_overlap_rejected_in_overlap_mode(self):
+        self._set_check_mode("overlap")
+        self._create_task("main", self.shift_morning)
+        # Отдых не проверяется: следующая смена подряд допустима
+        self._create_task("main", self.shift_day)
+        with self.assertRaises(ValidationError):
+            self._create_task("parallel", self.shift_morning)
+
+        task = self._create_task("parallel", self.shift_morning, employees=self.env["hr.employee"])
+        with self.assertRaises(ValidationError):
+            task.employee_ids = self.employee
+
+    def test_short_rest_rejected_in_rest_mode(self):
+        self._set_check_mode("rest")
+        self._create_task("main", self.shift_morning)
+        with self.assertRaises(ValidationError):
+            self._create_task("main", self.shift_day)
+        # Ночная смена начинается через 8 часов после утренней
+        self._create_task("main", self.shift_night)
+
+    def test_no_check_by_default(self):
+        self._set_check_mode("off")
+        self._create_task("main", self.shift_morning)
+        self._create_task("parallel", self.shift_morning)
+
+    def test_auto_take_respects_rest_mode(self):
+        self._set_check_mode("rest")
+        no_employees = self.env["hr.employee"]
+        morning_task = self._create_task("main", self.shift_morning)
+        morning_task.stage_id = self.stage_completed
+        night_task = self._create_task("main", self.shift_night, employees=no_employees)
+        next_morning_task = self._create_task("main", self.shift_morning, day=1, employees=no_employees)
+
+        # Ночная смена начинается через 8 часов после утренней: бригада переносится
+        self.assertEqual(night_task._auto_take_shift_tasks(), night_task)
+        self.assertEqual(night_task.employee_ids, self.employee)
+
+        # Смена сразу после ночной: бригада не переносится, задача всё равно берётся в работу
+        night_task.stage_id = self.stage_completed
+        self.assertEqual(next_morning_task._auto_take_shift_tasks(), next_morning_task)
+        self.assertEqual(next_morning_task.stage_id, self.stage_in_progress)
+        self.assertFalse(next_morning_task.employee_ids)
@@ -0,0 +1,200 @@
+"""
+Нагрузочные тесты горячих путей модуля на синтетических данных.
+
+Не входят в стандартный прогон, запуск:
+    odoo-bin -d <база> -i custom_project --test-tags custom_project_benchmark --stop-after-init
+
+Объём данных задаётся переменной окружения CUSTOM_PROJECT_BENCH_SCALE (по умолчанию 1.0:
+200 цехов, 60 суток плана по всем сменам, 5000 актов ОТК). План строится по собственным
+шаблонам теста: по одному на тип процесса, смену и день недельного цикла. Время и число SQL-запросов
+сравниваются с benchmark_baselines.json, если базовые значения записаны для того же масштаба.
+CUSTOM_PROJECT_BENCH_RECORD=1 перезаписывает базовые значения результатами прогона.
+"""
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from ..models.project_task import BULK_MODE_CONTEXT
+from .common import CustomProjectCase
+
+_logger = logging.getLogger(__name__)
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baselines.json")
+QUALITY_FIELDS = ["quality_status", "has_quality_control", "last_quality_control_id"]
+# Длина цикла шаблонов плана, дней
+TEMPLATE_CYCLE_DAYS = 7
+
+
+@tagged("-standard", "-at_install", "post_install", "custom_project_benchmark")
+class TestPlanningBenchmarks(CustomProjectCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.scale = float(os.environ.get("CUSTOM_PROJECT_BENCH_SCALE", "1.0"))
+        cls.project_count = max(int(200 * cls.scale), 1)
+        cls.plan_days = max(int(60 * cls.scale), 7)
+        cls.control_count = max(int(5000 * cls.scale), 10)
+        cls.results = {}
+        with open(BASELINES_PATH) as baselines_file:
+            cls.baselines = json.load(baselines_file)
+
+        cls.env = cls.env(context=dict(cls.env.context, **BULK_MODE_CONTEXT))
+        cls._create_templates([
+            (process_type, shift, day_number)
+            for process_type in ("main", "parallel")
+            for shift in (cls.shift_morning, cls.shift_day, cls.shift_night)
+            for day_number in range(1, TEMPLATE_CYCLE_DAYS + 1)
+        ])
+        cls.today_start = datetime.combine(fields.Date.today(), datetime.min.time())
+
+        started = time.perf_counter()
+        cls.employees = cls.env["hr.employee"].create(
+            [{"name": f"Сталевар {i}"} for i in range(50)]
+        )
+        cls.projects = cls.env["project.project"].create(
+            [{"name": f"Цех {i}"} for i in range(cls.project_count)]
+        )
+
+        # Месяцы плана по всем сменам с центром на сегодняшнем дне
+        date_start = cls.today_start - timedelta(days=cls.plan_days // 2)
+        for project in cls.projects:
+            cls._create_plan_schedule(project, date_start, cls.plan_days)._generate_tasks()
+
+        # Прошедшие смены завершены, чтобы CRON было что передавать
+        task_model = cls.env["project.task"].with_context(skip_successor_activation=True)
+        past_tasks = task_model.search([("date_start", "<", cls.today_start)])
+        past_tasks.write({"stage_id": cls.stage_completed.id, "employee_ids": [(6, 0, cls.employees[:3].ids)]})
+
+        rng = random.Random(42)
+        tasks = task_model.search([("project_id", "in", cls.projects.ids)])
+        cls.controls = cls.env["quality.control"].create([
+            {
+                "name": f"ОТК-{i}",
+                "task_id": rng.choice(tasks.ids),
+                "inspector_id": rng.choice(cls.employees.ids),
+                "status": rng.choice(["pending", "accepted", "rejected"]),
+                "product_batch": f"П-{i % 500}",
+            }
+            for i in range(cls.control_count)
+        ])
+        cls.env.flush_all()
+        cls.env.invalidate_all()
+        _logger.info(
+            "Синтетические данные: цехов %s, задач %s, актов ОТК %s за %.1f с",
+            cls.project_count, len(tasks), cls.control_count, time.perf_counter() - started,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        _logger.info("Результаты нагрузочных тестов (масштаб %s):", cls.scale)
+        for name, result in sorted(cls.results.items()):
+            _logger.info("  %-30s %9.3f с %8d запросов", name, result["seconds"], result["queries"])
+
+        if os.environ.get("CUSTOM_PROJECT_BENCH_RECORD") and cls.results:
+            cls.baselines["scale"] = cls.scale
+            cls.baselines["benchmarks"].update(
+                {name: {"seconds": round(r["seconds"], 3), "queries": r["queries"]} for name, r in cls.results.items()}
+            )
+            with open(BASELINES_PATH, "w") as baselines_file:
+                json.dump(cls.baselines, baselines_file, indent=4, ensure_ascii=False)
+        super().tearDownClass()
+
+    @classmethod
+    def _create_plan_schedule(cls, project, date_start, plan_days):
+        return cls._create_schedule(
+            project,
+            name=f"Расписание {project.name}",
+            process_type="both",
+            planning_days=plan_days,
+            date_start=date_start,
+        )
+
+    @contextmanager
+    def _benchmark(self, name):
+        """Замер времени и числа SQL-запросов блока, включая отложенную запись"""
+        self.env.flush_all()
+        queries_before = self.env.cr.sql_log_count
+        started = time.perf_counter()
+        yield
+        self.env.flush_all()
+        result = {
+            "seconds": time.perf_counter() - started,
+            "queries": self.env.cr.sql_log_count - queries_before,
+        }
+        self.results[name] = result
+        self._check_baseline(name, result)
+
+    def _check_baseline(self, name, result):
+        if self.baselines.get("scale") != self.scale:
+            return
+        baseline = self.baselines["benchmarks"].get(name) or {}
+        for metric in ("seconds", "queries"):
+            expected = baseline.get(metric)
+            if expected is None:
+                continue
+            limit = expected * (1 + self.baselines[f"{metric}_tolerance"])
+            self.assertLessEqual(
+                result[metric], limit,
+                f"{name}: {metric} {result[metric]} превышает базовое значение {expected}",
+            )
+
+    def test_generate_tasks(self):
+        project = self.env["project.project"].create({"name": "Цех генерации"})
+        schedule = self._create_plan_schedule(project, self.today_start, self.plan_days)
+        with self._benchmark("generate_tasks"):
+            schedule.action_generate_tasks()
+        self.assertTrue(schedule.generation_progress)
+
+    def test_cron_auto_take_shift_tasks(self):
+        task_model = self.env["project.task"]
+        with self._benchmark("cron_auto_take_shift_tasks"):
+            task_model._cron_auto_take_shift_tasks()
+        self.assertTrue(task_model.search_count([
+            ("date_start", ">=", self.today_start),
+            ("stage_id", "=", self.env.ref("custom_project.project_task_stage_in_progress").id),
+        ]))
+
+    def test_bulk_create_constrain_unique_task(self):
+        projects = self.env["project.project"].create([{"name": f"Цех массовой загрузки {i}"} for i in range(10)])
+        shifts = self.env["custom_project.shift"].search([])
+        vals_list = [
+            {
+                "name": "Работа",
+                "project_id": project.id,
+                "process_type": process_type,
+                "shift": shift.id,
+                "date_start": self.today_start + timedelta(days=day, hours=shift.start_hour),
+                "stage_id": self.stage_planned.id,
+            }
+            for project in projects
+            for day in range(90)
+            for shift in shifts
+            for process_type in ("main", "parallel")
+        ]
+        with self._benchmark("bulk_create_tasks"):
+            tasks = self.env["project.task"].create(vals_list)
+        with self._benchmark("constrain_unique_task"):
+            tasks._constrain_unique_task()
+
+    def test_compute_quality_summary(self):
+        tasks = self.controls.task_id
+        for fname in QUALITY_FIELDS:
+            self.env.add_to_compute(tasks._fields[fname], tasks)
+        with self._benchmark("compute_quality_summary"):
+            tasks.flush_recordset(QUALITY_FIELDS)
+
+    def test_delete_schedule_series(self):
+        project = self.env["project.project"].create({"name": "Цех удаления"})
+        schedule = self._create_plan_schedule(project, self.today_start, min(self.plan_days, 30))
+        schedule._generate_tasks()
+        with self._benchmark("delete_schedule_series"):
+            schedule.action_delete_schedule_series()
+        self.assertFalse(schedule.exists())
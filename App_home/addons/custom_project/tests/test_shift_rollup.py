@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from odoo.tests import tagged
+
+from .common import CustomProjectCase
+
+
+@tagged("post_install", "-at_install")
+class TestShiftRollup(CustomProjectCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.day = cls.plan_start.date()
+        cls.task_main, cls.task_parallel, cls.task_day = cls.env["project.task"].create([
+            cls._task_vals("main", cls.shift_morning, people_fact=3, material_consumption_kg=100),
+            cls._task_vals("parallel", cls.shift_morning, people_fact=2, material_consumption_kg=50),
+            cls._task_vals("main", cls.shift_day, people_fact=4, material_consumption_kg=70),
+        ])
+
+    @classmethod
+    def _task_vals(cls, process_type, shift, **vals):
+        return dict({
+            "name": "Работа",
+            "project_id": cls.project.id,
+            "process_type": process_type,
+            "shift": shift.id,
+            "date_start": cls.plan_start + timedelta(hours=shift.start_hour),
+            "stage_id": cls.stage_planned.id,
+        }, **vals)
+
+    def _rollup(self, shift):
+        return self.env["custom_project.shift.rollup"].search([
+            ("project_id", "=", self.project.id),
+            ("date", "=", self.day),
+            ("shift_id", "=", shift.id),
+        ])
+
+    def _assert_rollup(self, shift, task_count, people_fact, material_consumption_kg):
+        rollup = self._rollup(shift)
+        self.assertEqual(len(rollup), 1)
+        self.assertEqual(
+            (rollup.task_count, rollup.people_fact, rollup.material_consumption_kg),
+            (task_count, people_fact, material_consumption_kg),
+        )
+
+    def test_rollup_after_create(self):
+        self._assert_rollup(self.shift_morning, 2, 5, 150)
+        self._assert_rollup(self.shift_day, 1, 4, 70)
+
+    def test_rollup_after_write(self):
+        self.task_main.write({"people_fact": 6, "material_consumption_kg": 120})
+        self._assert_rollup(self.shift_morning, 2, 8, 170)
+
+        # Перенос задачи в другую смену меняет обе сводки
+        self.task_parallel.write({
+            "shift": self.shift_day.id,
+            "date_start": self.plan_start + timedelta(hours=self.shift_day.start_hour),
+        })
+        self._assert_rollup(self.shift_morning, 1, 6, 120)
+        self._assert_rollup(self.shift_day, 2, 6, 120)
+
+        self.task_day.active = False
+        self._assert_rollup(self.shift_day, 1, 2, 50)
+
+    def test_rollup_after_unlink(self):
+        self.task_parallel.unlink()
+        self._assert_rollup(self.shift_morning, 1, 3, 100)
+
+        # Смена без работ из сводки удаляется
+        self.task_main.unlink()
+        self.assertFalse(self._rollup(self.shift_morning))
+        self._assert_rollup(self.shift_day, 1, 4, 70)
+
+    def test_rollup_keeps_archived_tasks(self):
+        self.env["custom_project.task.archive"]._archive_tasks(self.task_main)
+        self._assert_rollup(self.shift_morning, 2, 5, 150)
+
+        # Пересчёт ключа после изменения рабочей задачи учитывает архив
+        self.task_parallel.people_fact = 4
+        self._assert_rollup(self.shift_morning, 2, 7, 150)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self.task_main.people_fact = 5
+        self.task_day.unlink()
+        rollup_model = self.env["custom_project.shift.rollup"]
+        fields_list = ["project_id", "date", "shift_id", "task_count", "people_fact", "material_consumption_kg"]
+        domain = [("project_id", "=", self.project.id)]
+        incremental = rollup_model.search_read(domain, fields_list, order="shift_id")
+
+        rollup_model.rebuild(self.day, self.day)
+        self.assertEqual(
+            [{k: v for k, v in row.items() if k != "id"} for row in incremental],
+            [{k: v for k, v in row.items() if k != "id"}
+             for row in rollup_model.search_read(domain, fields_list, order="shift_id")],
+        )
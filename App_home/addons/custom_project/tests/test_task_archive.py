@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from odoo.tests import tagged
+
+from .common import CustomProjectCase
+
+
+@tagged("post_install", "-at_install")
+class TestTaskArchive(CustomProjectCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.archived_task, cls.task = cls.env["project.task"].create([
+            {
+                "name": name,
+                "project_id": cls.project.id,
+                "process_type": "main",
+                "shift": cls.shift_morning.id,
+                "date_start": cls.plan_start + timedelta(days=day, hours=cls.shift_morning.start_hour),
+                "stage_id": cls.stage_planned.id,
+            }
+            for day, name in ((0, "Архивная работа"), (1, "Рабочая задача"))
+        ])
+        cls.archive = cls.env["custom_project.task.archive"]._archive_tasks(cls.archived_task)
+        cls.period = (cls.plan_start, cls.plan_start + timedelta(days=2))
+
+    def test_export_includes_archive(self):
+        domain = [
+            ("project_id", "=", self.project.id),
+            ("date_start", ">=", self.period[0]),
+            ("date_start", "<", self.period[1]),
+        ]
+        rows = list(self.env["project.task"]._iter_export_rows(domain))
+        self.assertEqual([row[3] for row in rows], ["Архивная работа", self.task.name])
+        self.assertEqual(rows[0][0], self.archive.date_start)
+
+        # Отбор по полю, которого нет в архиве, архив не затрагивает
+        rows = list(self.env["project.task"]._iter_export_rows(domain + [("stage_id", "!=", False)]))
+        self.assertEqual([row[3] for row in rows], [self.task.name])
+
+    def test_kpi_include_archive(self):
+        kpis = self.env["custom_project.shift.kpi"]._compute_kpis(*self.period, "project", (self.project.id,))
+        self.assertEqual([(row["group_id"], row["task_count"]) for row in kpis], [(self.project.id, 2)])
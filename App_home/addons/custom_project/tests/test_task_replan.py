@@ -0,0 +1,91 @@
+from odoo.tests import tagged
+
+from .common import CustomProjectCase
+
+
+@tagged("post_install", "-at_install")
+class TestTaskReplan(CustomProjectCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.templates = cls._create_templates([
+            ("main", cls.shift_morning, 1),
+            ("main", cls.shift_day, 1),
+        ])
+        cls.schedule = cls._create_schedule(planning_days=2)
+        cls.schedule.action_generate_tasks()
+
+    def _schedule_tasks(self):
+        return self.env["project.task"].with_context(active_test=False).search(
+            [("schedule_id", "=", self.schedule.id)]
+        )
+
+    def test_replan_keeps_creates_and_archives(self):
+        tasks = self._schedule_tasks()
+        self.assertEqual(len(tasks), 4)
+        morning_tasks = tasks.filtered(lambda t: t.shift == self.shift_morning)
+        day_tasks = tasks.filtered(lambda t: t.shift == self.shift_day)
+        started_task = day_tasks.sorted("date_start")[0]
+        started_task.stage_id = self.stage_in_progress
+
+        # Дневную смену убираем из шаблонов, ночную добавляем
+        self.templates.filtered(lambda t: t.shift == self.shift_day).active = False
+        self._create_templates([("main", self.shift_night, 1)])
+        self.schedule.action_replan_tasks()
+
+        tasks_after = self._schedule_tasks()
+        active_tasks = tasks_after.filtered("active")
+        night_tasks = active_tasks.filtered(lambda t: t.shift == self.shift_night)
+        self.assertEqual(len(night_tasks), 2, "Недостающие задачи ночной смены созданы")
+        self.assertFalse(night_tasks & tasks)
+        self.assertEqual(
+            active_tasks - night_tasks, morning_tasks | started_task,
+            "Совпадающие с планом и начатые задачи сохранены",
+        )
+        self.assertEqual(
+            tasks_after - active_tasks, day_tasks - started_task,
+            "Лишние запланированные задачи архивированы",
+        )
+        self.assertEqual(started_task.stage_id, self.stage_in_progress)
+
+    def test_replan_keeps_started_task_after_task_type_change(self):
+        tasks = self._schedule_tasks()
+        morning_tasks = tasks.filtered(lambda t: t.shift == self.shift_morning).sorted("date_start")
+        started_task, planned_task = morning_tasks
+        started_task.stage_id = self.stage_in_progress
+
+        # Шаблон той же смены теперь задаёт другой тип работы
+        new_task_type = self.env["project.task.type"].create(
+            {"name": "Тестовая разливка", "process_type": "main"}
+        )
+        self.templates.filtered(lambda t: t.shift == self.shift_morning).task_type_id = new_task_type
+        self.schedule.action_replan_tasks()
+
+        tasks_after = self._schedule_tasks()
+        active_morning = tasks_after.filtered(lambda t: t.active and t.shift == self.shift_morning)
+        self.assertIn(started_task, active_morning, "Начатая задача остаётся в своей смене")
+        self.assertTrue(started_task.active)
+        self.assertFalse(planned_task.active, "Запланированная задача старого типа архивирована")
+        new_tasks = active_morning - started_task
+        self.assertEqual(len(new_tasks), 1, "Новая задача создана только в свободной смене")
+        self.assertEqual(new_tasks.custom_task_type_id, new_task_type)
+        self.assertEqual(new_tasks.date_start, planned_task.date_start)
+
+    def test_replan_is_idempotent(self):
+        tasks = self._schedule_tasks()
+        self.schedule.action_replan_tasks()
+        self.assertEqual(self._schedule_tasks(), tasks)
+        self.assertTrue(all(tasks.mapped("active")))
+
+    def test_replan_restores_archived_and_syncs_names(self):
+        tasks = self._schedule_tasks()
+        archived_task = tasks[0]
+        archived_task.active = False
+        self.task_type_main.name = "Тестовая плавка (новая)"
+
+        self.schedule.action_replan_tasks()
+
+        self.assertEqual(self._schedule_tasks(), tasks, "Задачи не пересоздаются")
+        self.assertTrue(archived_task.active, "Архивная задача плана восстановлена")
+        self.assertEqual(set(tasks.mapped("name")), {"Тестовая плавка (новая)"})
@@ -1 +1,2 @@
-from . import task_series_wizard
\ No newline at end of file
+from . import task_series_wizard
+from . import quality_control_import_wizard
\ No newline at end of file
@@ -0,0 +1,59 @@
+import base64
+import io
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+
+
+class QualityControlImportWizard(models.TransientModel):
+    _name = "quality.control.import.wizard"
+    _description = "Импорт результатов контроля ОТК"
+
+    data_file = fields.Binary(string="Файл", required=True)
+    file_name = fields.Char(string="Имя файла")
+
+    file_format = fields.Selection(
+        [
+            ("csv", "CSV"),
+            ("jsonl", "JSON lines"),
+        ],
+        string="Формат",
+        required=True,
+        default="csv",
+    )
+
+    delimiter = fields.Char(string="Разделитель CSV", default=",", size=1)
+
+    state = fields.Selection(
+        [("draft", "Загрузка"), ("done", "Готово")], default="draft"
+    )
+    imported_count = fields.Integer(string="Создано актов", readonly=True)
+    error_count = fields.Integer(string="Отклонено строк", readonly=True)
+    error_log = fields.Text(string="Ошибки", readonly=True)
+
+    def action_import(self):
+        self.ensure_one()
+        if not self.data_file:
+            raise UserError(_("Выберите файл для импорта"))
+
+        stream = io.BytesIO(base64.b64decode(self.data_file))
+        result = self.env["quality.control"].import_inspection_stream(
+            stream, file_format=self.file_format, delimiter=self.delimiter or ","
+        )
+
+        self.write({
+            "state": "done",
+            "imported_count": result["imported"],
+            "error_count": len(result["errors"]),
+            "error_log": "\n".join(
+                _("Строка %s: %s") % (line_number, message)
+                for line_number, message in result["errors"]
+            ),
+        })
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "views": [(False, "form")],
+            "target": "new",
+        }
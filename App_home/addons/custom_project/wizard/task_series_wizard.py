@@ -1,10 +1,13 @@
-from datetime import timedelta
 from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
+from ..models.task_schedule import BACKGROUND_GENERATION_THRESHOLD
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Сколько конфликтов смен показывать в уведомлениях
+MAX_REPORTED_CONFLICTS = 10
+
 
 class TaskSeriesWizard(models.TransientModel):
     _name = "project.task.series.wizard"
@@ -40,6 +43,12 @@ class TaskSeriesWizard(models.TransientModel):
         default="1",
     )
     
+    planning_days = fields.Integer(
+        string="Горизонт планирования (дней)",
+        default=0,
+        help="Количество суток плана по всем сменам. 0 — только указанное количество смен",
+    )
+
     equipment_maintenance_days = fields.Integer(
         string="Дней на ТО оборудования", default=0, required=True
     )
@@ -51,6 +60,10 @@ class TaskSeriesWizard(models.TransientModel):
     estimated_end_date = fields.Date(
         string="Примерная дата окончания", compute="_compute_estimated_tasks"
     )
+
+    estimated_conflicts_count = fields.Integer(
+        string="Конфликтов со сменами", compute="_compute_estimated_tasks"
+    )
     
     date_start_display = fields.Date(
         string="Дата начала (отображение)", related="date_start", readonly=True
@@ -85,41 +98,65 @@ class TaskSeriesWizard(models.TransientModel):
         default="normal",
     )
 
-    @api.depends("shift_count", "equipment_maintenance_days", "process_type", "date_start")
+    @api.depends(
+        "project_id",
+        "start_shift_number",
+        "shift_count",
+        "planning_days",
+        "equipment_maintenance_days",
+        "process_type",
+        "date_start",
+    )
     def _compute_estimated_tasks(self):
-        """Расчет количества работ и даты окончания"""
+        """Расчет количества работ, даты окончания и конфликтов пробным планированием"""
         for wizard in self:
-            if not wizard.date_start:
-                wizard.estimated_tasks_count = 0
-                wizard.estimated_end_date = False
-                continue
-
-            # Расчет количества задач на основе типа процесса
-            base_tasks_per_shift = 3  # Основные задачи в смену
-            
-            if wizard.process_type == "both":
-                tasks_per_shift = base_tasks_per_shift + 2  # + вспомогательные работы
-            elif wizard.process_type == "parallel":
-                tasks_per_shift = 2  # Только вспомогательные работы
-            else:
-                tasks_per_shift = base_tasks_per_shift  # Только основные работы
-
-            # Учет дней ТО
-            maintenance_tasks = wizard.equipment_maintenance_days * 2  # 2 задачи в день на ТО
-            
-            total_tasks = int(wizard.shift_count) * tasks_per_shift + maintenance_tasks
-            wizard.estimated_tasks_count = total_tasks
-
-            # Расчет даты окончания
-            days_per_shift_cycle = 1  # Каждая смена - 1 день
-            total_calendar_days = int(wizard.shift_count) * days_per_shift_cycle
-            
-            # Добавляем дни на ТО оборудования
-            total_calendar_days += wizard.equipment_maintenance_days
-            
-            wizard.estimated_end_date = wizard.date_start + timedelta(
-                days=total_calendar_days
-            )
+            plan = wizard._get_dry_run_plan()
+            wizard.estimated_tasks_count = plan["task_count"]
+            wizard.estimated_end_date = plan["date_end"]
+            wizard.estimated_conflicts_count = len(plan["conflicts"])
+
+    def _get_dry_run_plan(self):
+        """Пробное планирование в памяти по тем же правилам, что и создание расписания"""
+        self.ensure_one()
+        empty_plan = {"task_count": 0, "date_end": False, "conflicts": []}
+        if not self.date_start:
+            return empty_plan
+
+        schedule = self.env["task.schedule"].new(self._prepare_schedule_vals())
+        try:
+            return schedule._plan_dry_run()
+        except UserError:
+            # Нет шаблонов или смен — планировать нечего
+            return empty_plan
+
+    def _prepare_schedule_vals(self):
+        return {
+            "name": f"Расписание {self.project_id.name} от {self.date_start}",
+            "project_id": self.project_id.id,
+            "process_type": self.process_type,
+            "start_shift": self.start_shift_number,
+            "shift_count": self.shift_count,
+            "planning_days": self.planning_days,
+            "equipment_maintenance_days": self.equipment_maintenance_days,
+            "date_start": self.date_start,
+        }
+
+    def _format_conflicts(self, conflicts):
+        """Текст конфликтов уникальности для уведомлений"""
+        shifts_by_id = self.env["custom_project.shift"]._get_shift_registry()["by_id"]
+        process_names = dict(self._fields["process_type"].selection)
+        lines = []
+        for conflict in conflicts[:MAX_REPORTED_CONFLICTS]:
+            shift = shifts_by_id.get(conflict["shift_id"])
+            lines.append(_("• %s, %s, %s — %s") % (
+                conflict["date"],
+                shift.name if shift else "",
+                process_names.get(conflict["process_type"], conflict["process_type"]),
+                _("уже есть работа") if conflict["existing"] else _("повтор в плане"),
+            ))
+        if len(conflicts) > MAX_REPORTED_CONFLICTS:
+            lines.append(_("… и ещё %s") % (len(conflicts) - MAX_REPORTED_CONFLICTS))
+        return "\n".join(lines)
 
     @api.constrains("equipment_maintenance_days")
     def _check_maintenance_days(self):
@@ -148,16 +185,36 @@ class TaskSeriesWizard(models.TransientModel):
     def action_create_series(self):
         self.ensure_one()
 
+        # Проверяем конфликты до записи, чтобы не создавать расписание впустую
+        plan = self._get_dry_run_plan()
+        if plan["conflicts"]:
+            raise ValidationError(
+                _("Работы уже запланированы в смены:\n%s") % self._format_conflicts(plan["conflicts"])
+            )
+
         # Создаём расписание
-        schedule = self.env["task.schedule"].create({
-            "name": f"Расписание {self.project_id.name} от {self.date_start}",
-            "project_id": self.project_id.id,
-            "process_type": self.process_type,
-            "start_shift": self.start_shift_number,
-            "shift_count": self.shift_count,
-            "equipment_maintenance_days": self.equipment_maintenance_days,
-            "date_start": self.date_start,
-        })
+        schedule = self.env["task.schedule"].create(self._prepare_schedule_vals())
+        next_action = {
+            "type": "ir.actions.act_window",
+            "res_model": "task.schedule",
+            "res_id": schedule.id,
+            "views": [(False, "form")],
+        }
+
+        # Крупные планы генерируем фоновым заданием, не удерживая HTTP-запрос
+        if plan["task_count"] > BACKGROUND_GENERATION_THRESHOLD:
+            schedule.action_enqueue_generation()
+            return {
+                "type": "ir.actions.client",
+                "tag": "display_notification",
+                "params": {
+                    "title": _("Расписание поставлено в очередь"),
+                    "message": _("Задачи (%s) создаются в фоне, ход генерации виден в расписании.")
+                    % plan["task_count"],
+                    "type": "info",
+                    "next": next_action,
+                },
+            }
 
         # Делегируем генерацию задач
         try:
@@ -171,14 +228,9 @@ class TaskSeriesWizard(models.TransientModel):
             "tag": "display_notification",
             "params": {
                 "title": _("Готово!"),
-                "message": _("Создано расписание с %s задачами.") % schedule.project_task_ids,
+                "message": _("Создано расписание с %s задачами.") % schedule.generation_progress,
                 "type": "success",
-                "next": {
-                    "type": "ir.actions.act_window",
-                    "res_model": "task.schedule",
-                    "res_id": schedule.id,
-                    "views": [(False, "form")],
-                },
+                "next": next_action,
             },
         }
 
@@ -194,32 +246,40 @@ class TaskSeriesWizard(models.TransientModel):
         return shift_pattern[(shift_number - 1) % 3]
 
     def action_preview_schedule(self):
-        """Предварительный просмотр расписания"""
+        """Предварительный просмотр расписания по пробному планированию"""
         self.ensure_one()
-        
+        plan = self._get_dry_run_plan()
+
+        message = _(
+            "Будет создано производственное расписание:\n"
+            "• Цех: %s\n"
+            "• Смен: %s\n"
+            "• Тип продукции: %s\n"
+            "• Объем: %s тонн\n"
+            "• Количество работ: %s\n"
+            "• Период: с %s по %s"
+        ) % (
+            self.project_id.name,
+            self.shift_count,
+            dict(self._fields["product_type"].selection).get(self.product_type),
+            self.production_volume,
+            plan["task_count"],
+            self.date_start,
+            plan["date_end"],
+        )
+        if plan["conflicts"]:
+            message += _("\nКонфликты со сменами (%s):\n%s") % (
+                len(plan["conflicts"]),
+                self._format_conflicts(plan["conflicts"]),
+            )
+
         return {
             "type": "ir.actions.client",
             "tag": "display_notification",
             "params": {
                 "title": _("Предварительный просмотр"),
-                "message": _(
-                    "Будет создано производственное расписание:\n"
-                    "• Цех: %s\n"
-                    "• Смен: %s\n"
-                    "• Тип продукции: %s\n"
-                    "• Объем: %s тонн\n"
-                    "• Примерное количество работ: %s\n"
-                    "• Период: с %s по %s"
-                ) % (
-                    self.project_id.name,
-                    self.shift_count,
-                    dict(self._fields["product_type"].selection).get(self.product_type),
-                    self.production_volume,
-                    self.estimated_tasks_count,
-                    self.date_start,
-                    self.estimated_end_date,
-                ),
-                "type": "info",
+                "message": message,
+                "type": "warning" if plan["conflicts"] else "info",
                 "sticky": True,
             },
-        }
\ No newline at end of file
+        }
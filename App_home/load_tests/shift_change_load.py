@@ -0,0 +1,316 @@
+"""
+Нагрузочный сценарий пересменки для модуля custom_project.
+
+Десятки мастеров смен одновременно через XML-RPC фиксируют факт по своим цехам
+(people_fact, employee_ids), завершают работы (stage_id) и тем самым запускают
+передачу смены, пока параллельно принудительно запускается CRON автовзятия.
+По итогам печатаются пропускная способность, перцентили задержек по операциям,
+повторы после конфликтов сериализации и время ожидания блокировок в PostgreSQL.
+
+Пример:
+    python shift_change_load.py --url http://localhost:8069 --db odoo \\
+        --user admin --password admin --clients 40 --duration 120 \\
+        --pg-dsn "host=localhost port=5432 dbname=odoo user=odoo password=odoo"
+
+Сервер сам повторяет транзакцию после конфликта сериализации, поэтому клиентские
+повторы видят только случаи, когда серверные попытки исчерпаны. Конфликты на стороне
+сервера оцениваются по приросту счётчиков pg_stat_database за прогон: откаты транзакций
+(xact_rollback — все откаты базы, включая откаты вне сценария) и взаимоблокировки
+(deadlocks). Счётчики и выборка pg_stat_activity снимаются при заданном --pg-dsn
+и требуют psycopg2.
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+import xmlrpc.client
+from collections import defaultdict
+
+# Признаки конфликтов параллельных транзакций в ответе сервера
+CONCURRENCY_FAULT_MARKERS = (
+    "could not serialize access",
+    "concurrent update",
+    "deadlock detected",
+    "lock timeout",
+    "could not obtain lock",
+)
+# Повторов одной операции после конфликта
+MAX_RETRIES = 5
+# Период выборки ожиданий блокировок, секунд
+LOCK_SAMPLE_INTERVAL = 0.2
+# Пауза перед итоговым снимком pg_stat_database, секунд: простаивающие соединения
+# сбрасывают накопленную статистику не реже раза в 10 секунд (PostgreSQL 15+)
+PG_STATS_FLUSH_WAIT = 11
+# Счётчики pg_stat_database, прирост которых показывается в отчёте
+PG_DATABASE_COUNTERS = ("xact_commit", "xact_rollback", "deadlocks")
+
+
+class Stats:
+    """Потокобезопасный сбор задержек, повторов и ошибок по операциям"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.retries = defaultdict(int)
+        self.failures = defaultdict(int)
+        self.lock_wait_seconds = 0.0
+        self.max_lock_waiters = 0
+        self.database_counters = {}
+
+    def add_latency(self, operation, seconds):
+        with self.lock:
+            self.latencies[operation].append(seconds)
+
+    def add_retry(self, operation):
+        with self.lock:
+            self.retries[operation] += 1
+
+    def add_failure(self, operation):
+        with self.lock:
+            self.failures[operation] += 1
+
+
+class RpcClient:
+    """Клиент XML-RPC одного мастера (ServerProxy не потокобезопасен)"""
+
+    def __init__(self, args, stats):
+        self.args = args
+        self.stats = stats
+        common = xmlrpc.client.ServerProxy(f"{args.url}/xmlrpc/2/common", allow_none=True)
+        self.uid = common.authenticate(args.db, args.user, args.password, {})
+        if not self.uid:
+            raise SystemExit("Не удалось авторизоваться в Odoo")
+        self.models = xmlrpc.client.ServerProxy(f"{args.url}/xmlrpc/2/object", allow_none=True)
+
+    def call(self, operation, model, method, *args, **kwargs):
+        """Вызов метода модели с замером задержки и повтором после конфликта"""
+        for attempt in range(MAX_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                result = self.models.execute_kw(
+                    self.args.db, self.uid, self.args.password, model, method, list(args), kwargs
+                )
+            except xmlrpc.client.Fault as fault:
+                fault_text = str(fault.faultString).lower()
+                if attempt < MAX_RETRIES and any(marker in fault_text for marker in CONCURRENCY_FAULT_MARKERS):
+                    self.stats.add_retry(operation)
+                    time.sleep(random.uniform(0.05, 0.2) * (attempt + 1))
+                    continue
+                self.stats.add_failure(operation)
+                return None
+            self.stats.add_latency(operation, time.perf_counter() - started)
+            return result
+        return None
+
+
+def get_stage_ids(client):
+    rows = client.call(
+        "setup", "ir.model.data", "search_read",
+        [("module", "=", "custom_project"), ("model", "=", "project.task.type"),
+         ("name", "in", ["project_task_stage_planned", "project_task_stage_in_progress", "project_task_stage_completed"])],
+        fields=["name", "res_id"],
+    )
+    return {row["name"]: row["res_id"] for row in rows or []}
+
+
+def get_auto_take_cron_ids(client):
+    rows = client.call(
+        "setup", "ir.model.data", "search_read",
+        [("module", "=", "custom_project"), ("model", "=", "ir.cron"),
+         ("name", "like", "ir_cron_auto_take_shift_tasks")],
+        fields=["res_id"],
+    )
+    return [row["res_id"] for row in rows or []]
+
+
+def shift_master(args, stats, project_id, stage_ids, employee_ids, deadline):
+    """Сценарий мастера смены: факт по работам цеха и завершение текущих работ"""
+    client = RpcClient(args, stats)
+    rng = random.Random(project_id)
+    task_domain = [
+        ("project_id", "=", project_id),
+        ("stage_id", "in", [stage_ids["project_task_stage_planned"], stage_ids["project_task_stage_in_progress"]]),
+    ]
+    while time.monotonic() < deadline:
+        tasks = client.call(
+            "search_read_tasks", "project.task", "search_read", task_domain,
+            fields=["id", "stage_id"], limit=args.page_size, order="date_start asc, id asc",
+        )
+        if not tasks:
+            time.sleep(1)
+            continue
+
+        task = rng.choice(tasks)
+        client.call(
+            "write_fact", "project.task", "write", [task["id"]],
+            {
+                "people_fact": rng.randint(1, 8),
+                "employee_ids": [(6, 0, rng.sample(employee_ids, min(3, len(employee_ids))))],
+            },
+        )
+        if task["stage_id"] and task["stage_id"][0] == stage_ids["project_task_stage_in_progress"]:
+            client.call(
+                "complete_task", "project.task", "write", [task["id"]],
+                {"stage_id": stage_ids["project_task_stage_completed"]},
+            )
+        else:
+            client.call(
+                "start_task", "project.task", "write", [task["id"]],
+                {"stage_id": stage_ids["project_task_stage_in_progress"]},
+            )
+        time.sleep(rng.uniform(0, args.think_time))
+
+
+def cron_runner(args, stats, cron_ids, deadline):
+    """Параллельный принудительный запуск CRON автовзятия"""
+    client = RpcClient(args, stats)
+    while time.monotonic() < deadline:
+        for cron_id in cron_ids:
+            client.call("cron_auto_take", "ir.cron", "method_direct_trigger", [cron_id])
+        time.sleep(args.cron_interval)
+
+
+def lock_sampler(args, stats, stop_event):
+    """Оценка времени ожидания блокировок по выборкам pg_stat_activity"""
+    import psycopg2
+
+    connection = psycopg2.connect(args.pg_dsn)
+    connection.autocommit = True
+    with connection.cursor() as cr:
+        while not stop_event.is_set():
+            cr.execute(
+                """
+                SELECT COUNT(*)
+                  FROM pg_stat_activity
+                 WHERE datname = %s
+                   AND wait_event_type = 'Lock'
+                """,
+                [args.db],
+            )
+            waiters = cr.fetchone()[0]
+            with stats.lock:
+                stats.lock_wait_seconds += waiters * LOCK_SAMPLE_INTERVAL
+                stats.max_lock_waiters = max(stats.max_lock_waiters, waiters)
+            stop_event.wait(LOCK_SAMPLE_INTERVAL)
+    connection.close()
+
+
+def read_database_counters(args):
+    """Снимок счётчиков транзакций базы из pg_stat_database"""
+    import psycopg2
+
+    connection = psycopg2.connect(args.pg_dsn)
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cr:
+            # Без сброса снимка статистика в пределах сессии может быть закэширована
+            cr.execute("SELECT pg_stat_clear_snapshot()")
+            cr.execute(
+                f"SELECT {', '.join(PG_DATABASE_COUNTERS)} FROM pg_stat_database WHERE datname = %s",
+                [args.db],
+            )
+            row = cr.fetchone()
+    finally:
+        connection.close()
+    return dict(zip(PG_DATABASE_COUNTERS, row)) if row else {}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def print_report(stats, elapsed):
+    total_ops = sum(len(values) for values in stats.latencies.values())
+    print(f"\nДлительность: {elapsed:.1f} с, операций: {total_ops}, "
+          f"пропускная способность: {total_ops / elapsed:.1f} оп/с")
+    print(f"{'Операция':<20}{'кол-во':>8}{'p50, мс':>10}{'p90, мс':>10}{'p99, мс':>10}"
+          f"{'сред., мс':>11}{'повторы':>9}{'ошибки':>8}")
+    for operation in sorted(set(stats.latencies) | set(stats.retries) | set(stats.failures)):
+        values = stats.latencies.get(operation) or [0.0]
+        print(
+            f"{operation:<20}{len(stats.latencies.get(operation, [])):>8}"
+            f"{percentile(values, 0.5) * 1000:>10.1f}{percentile(values, 0.9) * 1000:>10.1f}"
+            f"{percentile(values, 0.99) * 1000:>10.1f}{statistics.mean(values) * 1000:>11.1f}"
+            f"{stats.retries.get(operation, 0):>9}{stats.failures.get(operation, 0):>8}"
+        )
+    print(f"Повторов после конфликтов сериализации (клиент): {sum(stats.retries.values())}")
+    if stats.database_counters:
+        counters = stats.database_counters
+        print(f"PostgreSQL за прогон: фиксаций {counters['xact_commit']}, "
+              f"откатов {counters['xact_rollback']}, взаимоблокировок {counters['deadlocks']}")
+    if stats.max_lock_waiters:
+        print(f"Ожидание блокировок (оценка): {stats.lock_wait_seconds:.1f} с, "
+              f"максимум одновременно ожидающих: {stats.max_lock_waiters}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Нагрузочный сценарий пересменки custom_project")
+    parser.add_argument("--url", default="http://localhost:8069")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--clients", type=int, default=30, help="Количество мастеров смен")
+    parser.add_argument("--duration", type=int, default=60, help="Длительность, секунд")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Пауза мастера между действиями, секунд")
+    parser.add_argument("--page-size", type=int, default=20, help="Работ цеха в выборке мастера")
+    parser.add_argument("--cron-interval", type=float, default=5.0, help="Период запуска CRON, секунд (0 — не запускать)")
+    parser.add_argument("--pg-dsn", help="DSN PostgreSQL для выборки блокировок и счётчиков pg_stat_database")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    stats = Stats()
+    setup_client = RpcClient(args, stats)
+
+    stage_ids = get_stage_ids(setup_client)
+    project_ids = setup_client.call("setup", "project.project", "search", [], limit=args.clients) or []
+    employee_ids = setup_client.call("setup", "hr.employee", "search", [], limit=200) or []
+    if not project_ids or not employee_ids or len(stage_ids) < 3:
+        raise SystemExit("Нужны цеха, сотрудники и стадии модуля custom_project")
+    cron_ids = get_auto_take_cron_ids(setup_client) if args.cron_interval > 0 else []
+    stats.latencies.pop("setup", None)
+
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(
+            target=shift_master,
+            args=(args, stats, project_ids[i % len(project_ids)], stage_ids, employee_ids, deadline),
+        )
+        for i in range(args.clients)
+    ]
+    if cron_ids:
+        threads.append(threading.Thread(target=cron_runner, args=(args, stats, cron_ids, deadline)))
+
+    stop_event = threading.Event()
+    sampler = None
+    counters_before = {}
+    if args.pg_dsn:
+        counters_before = read_database_counters(args)
+        sampler = threading.Thread(target=lock_sampler, args=(args, stats, stop_event))
+        sampler.start()
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    stop_event.set()
+    if sampler:
+        sampler.join()
+    if counters_before:
+        time.sleep(PG_STATS_FLUSH_WAIT)
+        counters_after = read_database_counters(args)
+        stats.database_counters = {
+            name: counters_after[name] - counters_before[name] for name in PG_DATABASE_COUNTERS
+        }
+    print_report(stats, elapsed)
+
+
+if __name__ == "__main__":
+    main()